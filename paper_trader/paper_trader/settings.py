@@ -35,6 +35,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'trading.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +66,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'trading.context_processors.market_data',
             ],
         },
     },
@@ -117,5 +119,77 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'trading' / 'static']
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Authentication: every user trades from their own portfolio
+LOGIN_URL = "login"
+LOGIN_REDIRECT_URL = "portfolio"
+LOGOUT_REDIRECT_URL = "instrument_list"
+
+# Market data
+# Provider is "yfinance" for live prices or "local" for deterministic offline data.
+MARKET_DATA_PROVIDER = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+MARKET_DATA_QUOTE_TTL = 60  # seconds a cached quote stays fresh
+MARKET_DATA_HISTORY_TTL = 900  # seconds cached price history stays fresh
+MARKET_DATA_CACHE_SIZE = 1024  # max cached entries before LRU eviction
+MARKET_DATA_BATCH_SIZE = 100  # symbols per batched history download
+MARKET_DATA_MAX_WORKERS = 16  # threads used to fetch quotes concurrently
+MARKET_DATA_QUOTE_TIMEOUT = 3  # seconds a single concurrent quote may take
+MARKET_DATA_FANOUT_DEADLINE = 5  # seconds before a concurrent fetch gives up
+MARKET_DATA_HISTORY_TIMEOUT = 20  # seconds for one batched history download in async views
+
+# Circuit breaker: calls slower than the timeouts above count as failures too
+MARKET_DATA_BREAKER_WINDOW = 20  # most recent vendor calls the failure rate is measured over
+MARKET_DATA_BREAKER_FAILURE_RATE = 0.5  # share of failed calls that opens the breaker
+MARKET_DATA_BREAKER_MIN_CALLS = 5  # calls in the window before the breaker may open
+MARKET_DATA_BREAKER_RESET_TIMEOUT = 30  # seconds open before one trial call is let through
+
+# Set when `manage.py refresh_prices` is running: list and portfolio pages then
+# read prices from the database and never call the data vendor themselves.
+MARKET_DATA_USE_STORED_PRICES = os.environ.get("MARKET_DATA_USE_STORED_PRICES") == "1"
+PRICE_REFRESH_INTERVAL = 60  # seconds between refresh_prices passes
+PRICE_BAR_BACKFILL_PERIOD = "1y"  # history downloaded the first time an instrument is synced
+
+# Live price stream (served through asgi.py)
+PRICE_STREAM_INTERVAL = 5  # seconds between shared upstream fetches
+PRICE_STREAM_KEEPALIVE = 15  # seconds of silence before a keep-alive comment
+PRICE_STREAM_MAX_SYMBOLS = 200  # per connection
+
+# Seconds between price ticks in `manage.py match_orders`
+ORDER_MATCH_INTERVAL = 5
+
+# Portfolio snapshots (`manage.py take_snapshots`)
+SNAPSHOT_INTERVAL = 300  # seconds per snapshot bucket
+SNAPSHOT_INTRADAY_RETENTION_DAYS = 7  # older intraday rows are compacted to one per day
+LEADERBOARD_PAGE_SIZE = 50  # portfolios per leaderboard page; re-ranked with every snapshot
+
+# Instrument autocomplete (trading/search.py)
+SEARCH_INDEX_CHECK_INTERVAL = 5  # seconds between checks that the instrument universe is unchanged
+SEARCH_MAX_RESULTS = 25
+
+# Transaction and snapshot exports (trading/exports.py)
+EXPORT_CHUNK_SIZE = 5000  # rows read per query and sent per chunk (a Parquet row group)
+
+# One JSON line per request from trading.middleware.RequestMetricsMiddleware;
+# set REQUEST_METRICS_LOG=1 to print them. Aggregates are always at /metrics/.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "trading.metrics": {
+            "handlers": ["console"],
+            "level": "INFO" if os.environ.get("REQUEST_METRICS_LOG") == "1" else "WARNING",
+        },
+    },
+}
+
+# Rendered pages and chart fragments are cached per price version (trading/pagecache.py).
+# Point REDIS_URL at a shared cache in production so that price updates written by
+# refresh_prices reach every worker; the default cache is local to each process.
+if os.environ.get("REDIS_URL"):
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": os.environ["REDIS_URL"]}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "OPTIONS": {"MAX_ENTRIES": 10000}}}
+PAGE_CACHE_TIMEOUT = 3600  # seconds a rendered page or fragment is kept; a price change retires it sooner
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
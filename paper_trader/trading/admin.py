@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Instrument, Portfolio, Holding, Transaction
+from .models import Instrument, Portfolio, Holding, Transaction, Order
 
 admin.site.register(Instrument)
 admin.site.register(Portfolio)
 admin.site.register(Holding)
-admin.site.register(Transaction)
\ No newline at end of file
+admin.site.register(Transaction)
+admin.site.register(Order)
@@ -0,0 +1,108 @@
+"""Vectorised portfolio performance metrics.
+
+Snapshot and bar history is loaded once into pandas frames (dates down the
+rows, one column per portfolio or instrument) and every metric is computed
+column-wise, so the cost is a couple of queries plus array maths no matter
+how many portfolios or days are involved.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from django.db.models import F
+
+from .models import PortfolioSnapshot, PriceBar
+
+TRADING_DAYS = 252
+METRICS = ["time_weighted_return", "volatility", "max_drawdown", "sharpe"]
+
+
+def snapshot_frame(portfolio_ids=None):
+    """Portfolio values since each portfolio's last reset, as a date × portfolio frame."""
+    snapshots = PortfolioSnapshot.objects.filter(epoch=F("portfolio__epoch"))
+    if portfolio_ids is not None:
+        snapshots = snapshots.filter(portfolio_id__in=portfolio_ids)
+    # Intraday snapshots collapse to the last value of each day
+    rows = snapshots.order_by("timestamp").values_list("date", "portfolio_id", "total_value")
+
+    frame = pd.DataFrame.from_records(list(rows), columns=["date", "portfolio", "value"])
+    if frame.empty:
+        return pd.DataFrame()
+    frame["value"] = frame["value"].astype(float)
+    return frame.pivot_table(index="date", columns="portfolio", values="value", aggfunc="last").sort_index()
+
+
+def close_frame(instrument_ids, start=None):
+    """Closing prices as a date × instrument frame of floats."""
+    bars = PriceBar.objects.filter(instrument_id__in=instrument_ids)
+    if start is not None:
+        bars = bars.filter(date__gte=start)
+    rows = bars.values_list("date", "instrument_id", "close")
+
+    frame = pd.DataFrame.from_records(list(rows), columns=["date", "instrument", "close"])
+    if frame.empty:
+        return pd.DataFrame()
+    frame["close"] = frame["close"].astype(float)
+    return frame.pivot(index="date", columns="instrument", values="close").sort_index()
+
+
+def performance(values, risk_free_rate=0.0):
+    """Return one row of metrics per column of a date × series value frame.
+
+    ``time_weighted_return`` chains the period returns, ``volatility`` and
+    ``sharpe`` are annualised from daily returns and ``max_drawdown`` is the
+    worst fall from a running peak (a negative fraction).
+    """
+    if values.empty:
+        return pd.DataFrame(columns=METRICS)
+
+    returns = values.pct_change(fill_method=None)
+    std = returns.std()
+    excess = returns.mean() - risk_free_rate / TRADING_DAYS
+
+    metrics = pd.DataFrame({
+        "time_weighted_return": (1 + returns.fillna(0)).prod() - 1,
+        "volatility": std * math.sqrt(TRADING_DAYS),
+        "max_drawdown": (values / values.cummax() - 1).min(),
+        "sharpe": excess / std * math.sqrt(TRADING_DAYS),
+    })
+    return metrics.replace([np.inf, -np.inf], np.nan)
+
+
+def holding_contributions(holdings, start_value, start=None):
+    """Each holding's price move over the window as a fraction of ``start_value``."""
+    quantities = pd.Series({h.instrument_id: float(h.quantity) for h in holdings}, dtype=float)
+    closes = close_frame(quantities.index.tolist(), start)
+    if closes.empty or not start_value:
+        return {}
+
+    moves = closes.ffill().iloc[-1] - closes.bfill().iloc[0]
+    contributions = (quantities * moves / start_value).dropna()
+    symbols = {h.instrument_id: h.instrument.symbol for h in holdings}
+    return {symbols[inst_id]: _clean(value) for inst_id, value in contributions.items()}
+
+
+def _clean(value):
+    return None if value is None or np.isnan(value) else round(float(value), 6)
+
+
+def portfolio_analytics(portfolio, holdings):
+    """Everything the portfolio page and analytics API need for one portfolio."""
+    values = snapshot_frame([portfolio.pk])
+    if values.empty:
+        series = pd.Series(dtype=float)
+    else:
+        series = values[portfolio.pk].dropna()
+
+    metrics = performance(series.to_frame())
+    row = metrics.iloc[0] if not metrics.empty else pd.Series(index=METRICS, dtype=float)
+    start = series.index[0] if not series.empty else None
+
+    return {
+        "dates": [day.strftime("%Y-%m-%d") for day in series.index],
+        "values": [round(value, 2) for value in series.tolist()],
+        "daily_returns": [_clean(r) for r in series.pct_change().iloc[1:].tolist()],
+        "metrics": {name: _clean(row[name]) for name in METRICS},
+        "contributions": holding_contributions(holdings, series.iloc[0] if start else 0, start),
+    }
@@ -0,0 +1,210 @@
+"""Replay stored daily bars through the app's execution rules, in memory.
+
+The strategy is a moving-average crossover: a symbol is bought when its fast
+average closes above its slow average and sold when it closes back below.
+Signals for the whole universe are computed at once with pandas; the day
+loop only visits days where some signal flips, and trades go through the
+same average-cost ledger as live orders (cash can't go negative, sells are
+capped at the position). Nothing touches the database until a result is
+saved.
+
+``simulate`` is free of Django so sweep workers can import this module in a
+fresh process; the functions that read or write models import them lazily.
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from .ledger import ZERO, Position, apply_buy, apply_sell
+
+STARTING_CASH = Decimal("10000.00")
+DEFAULTS = {"fast": 20, "slow": 50, "position_size": 0.1}
+
+
+@dataclass(frozen=True)
+class Trade:
+    date: object
+    symbol: str
+    side: str
+    quantity: Decimal
+    price: Decimal
+
+
+@dataclass
+class BacktestResult:
+    params: dict
+    equity: pd.Series
+    trades: list
+    cash: Decimal
+    realized_pnl: Decimal
+    metrics: dict = field(default_factory=dict)
+
+    @property
+    def final_value(self):
+        return round(float(self.equity.iloc[-1]), 2) if len(self.equity) else float(self.cash)
+
+
+def _price(value):
+    return Decimal(str(round(float(value), 4)))
+
+
+def simulate(closes, fast=20, slow=50, position_size=0.1, cash=STARTING_CASH):
+    """Run the crossover strategy over a date × symbol frame of closes.
+
+    ``position_size`` is the fraction of current equity put into each new
+    position, limited by the cash on hand; quantities are whole shares.
+    """
+    params = {"fast": fast, "slow": slow, "position_size": position_size}
+    closes = closes.sort_index().ffill()
+    if closes.empty:
+        return BacktestResult(params, pd.Series(dtype=float), [], Decimal(cash), ZERO)
+
+    signal = closes.rolling(fast).mean() > closes.rolling(slow).mean()
+    previous = signal.shift(fill_value=False)
+    entries = (signal & ~previous).to_numpy()
+    exits = (~signal & previous).to_numpy()
+
+    prices = closes.to_numpy()
+    dates = closes.index
+    symbols = list(closes.columns)
+
+    cash = Decimal(cash)
+    realized = ZERO
+    positions = {}
+    trades = []
+    quantities = np.full(prices.shape, np.nan)
+    quantities[0] = 0
+    cash_by_day = np.full(len(dates), np.nan)
+    cash_by_day[0] = float(cash)
+
+    for i in np.flatnonzero(entries.any(axis=1) | exits.any(axis=1)):
+        row = prices[i]
+        for j in np.flatnonzero(exits[i]):
+            position = positions.pop(j, None)
+            if position is None:  # the entry couldn't be afforded
+                continue
+            price = _price(row[j])
+            quantity = position.quantity
+            gain, _ = apply_sell(position, quantity, price)
+            realized += gain
+            cash += quantity * price
+            quantities[i, j] = 0
+            trades.append(Trade(dates[i], symbols[j], "SELL", quantity, price))
+
+        equity = float(cash) + sum(float(p.quantity) * row[j] for j, p in positions.items())
+        budget = equity * position_size
+        for j in np.flatnonzero(entries[i]):
+            quantity = int(min(budget, float(cash)) // row[j])
+            if quantity <= 0:
+                continue
+            price = _price(row[j])
+            quantity = Decimal(quantity)
+            if quantity * price > cash:
+                quantity -= 1
+            if quantity <= 0:
+                continue
+            apply_buy(positions.setdefault(j, Position()), quantity, price)
+            cash -= quantity * price
+            quantities[i, j] = float(quantity)
+            trades.append(Trade(dates[i], symbols[j], "BUY", quantity, price))
+
+        cash_by_day[i] = float(cash)
+
+    # Positions only change on trade days, so carry them forward to value every day
+    held = pd.DataFrame(quantities, index=dates, columns=symbols).ffill()
+    equity = (held * closes.fillna(0)).sum(axis=1) + pd.Series(cash_by_day, index=dates).ffill()
+    return BacktestResult(params, equity, trades, cash, realized)
+
+
+def load_closes(symbols, start, end):
+    """Stored closes as a date × symbol frame of floats, in one query."""
+    from .models import PriceBar
+
+    rows = PriceBar.objects.filter(instrument__symbol__in=symbols, date__range=(start, end)).values_list(
+        "date", "instrument__symbol", "close"
+    )
+    frame = pd.DataFrame.from_records(list(rows), columns=["date", "symbol", "close"])
+    if frame.empty:
+        return pd.DataFrame()
+    frame["close"] = frame["close"].astype(float)
+    return frame.pivot(index="date", columns="symbol", values="close").sort_index()
+
+
+def _with_metrics(result):
+    from .analytics import METRICS, _clean, performance
+
+    if len(result.equity):
+        row = performance(result.equity.to_frame()).iloc[0]
+        result.metrics = {name: _clean(row[name]) for name in METRICS}
+    return result
+
+
+def run_backtest(symbols, start, end, cash=STARTING_CASH, **params):
+    closes = load_closes(symbols, start, end)
+    return _with_metrics(simulate(closes, cash=cash, **{**DEFAULTS, **params}))
+
+
+_worker_closes = None
+
+
+def _init_worker(closes):
+    global _worker_closes
+    _worker_closes = closes
+
+
+def _simulate_in_worker(params):
+    return simulate(_worker_closes, **params)
+
+
+def sweep(symbols, start, end, grid, workers=None, cash=STARTING_CASH, **params):
+    """Run every combination in ``grid`` (``{"fast": [10, 20], ...}``).
+
+    Bars are loaded once and handed to each worker process when it starts;
+    ``workers=1`` runs inline. Results come back in grid order.
+    """
+    closes = load_closes(symbols, start, end)
+    combos = [
+        {**DEFAULTS, **params, "cash": cash, **dict(zip(grid, values))}
+        for values in itertools.product(*grid.values())
+    ]
+
+    if workers == 1:
+        results = [simulate(closes, **combo) for combo in combos]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(closes,)) as pool:
+            results = list(pool.map(_simulate_in_worker, combos))
+    return [_with_metrics(result) for result in results]
+
+
+def save_result(result, symbols, start, end, cash=STARTING_CASH):
+    """Store a result and all its trades with two bulk writes."""
+    from .models import BacktestRun, BacktestTrade
+
+    run = BacktestRun.objects.create(
+        symbols=",".join(symbols),
+        start=start,
+        end=end,
+        parameters=result.params,
+        starting_cash=cash,
+        final_value=Decimal(str(result.final_value)),
+        metrics=result.metrics,
+        equity={
+            "dates": [day.strftime("%Y-%m-%d") for day in result.equity.index],
+            "values": [round(value, 2) for value in result.equity.tolist()],
+        },
+    )
+    BacktestTrade.objects.bulk_create(
+        (
+            BacktestTrade(
+                run=run, date=t.date, symbol=t.symbol, side=t.side, quantity=t.quantity, price=t.price
+            )
+            for t in result.trades
+        ),
+        batch_size=2000,
+    )
+    return run
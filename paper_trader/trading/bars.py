@@ -0,0 +1,168 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+
+from . import marketdata, pagecache
+from .models import PriceBar
+
+BAR_FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+def last_session(today=None):
+    """Most recent weekday, i.e. the latest date a daily bar can exist for."""
+    today = today or date.today()
+    while today.weekday() >= 5:
+        today -= timedelta(days=1)
+    return today
+
+
+def _price(value):
+    return Decimal(str(round(float(value), 4)))
+
+
+def _bars_from_history(instrument, hist):
+    bars = []
+    for ts, row in hist.iterrows():
+        close = row["Close"]
+        volume = row.get("Volume", 0)
+        if close != close:  # NaN
+            continue
+        bars.append(PriceBar(
+            instrument=instrument,
+            date=ts.date(),
+            open=_price(row.get("Open", close)),
+            high=_price(row.get("High", close)),
+            low=_price(row.get("Low", close)),
+            close=_price(close),
+            volume=int(volume) if volume == volume else 0,
+        ))
+    return bars
+
+
+def save_bars(bars):
+    """Insert bars, overwriting any that already exist for the same day."""
+    kwargs = {"update_conflicts": True, "update_fields": BAR_FIELDS}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs["unique_fields"] = ["instrument", "date"]
+    PriceBar.objects.bulk_create(bars, batch_size=1000, **kwargs)
+    pagecache.bump({bar.instrument.symbol for bar in bars})
+
+
+def _last_dates(instruments):
+    return (
+        PriceBar.objects.filter(instrument__in=instruments)
+        .values("instrument_id")
+        .annotate(last=Max("date"))
+        .values_list("instrument_id", "last")
+    )
+
+
+def _group_by_last_date(instruments, last_dates):
+    session = last_session()
+    by_start = defaultdict(list)
+    for inst in instruments:
+        last = last_dates.get(inst.id)
+        if last is None or last < session:
+            by_start[last].append(inst)
+    return by_start
+
+
+def _bars_for(group, histories):
+    bars = []
+    for inst in group:
+        hist = histories.get(inst.symbol)
+        if hist is not None:
+            bars.extend(_bars_from_history(inst, hist))
+    return bars
+
+
+def sync_bars(instruments, refresh=False):
+    """Download only the bars newer than what is stored for each instrument.
+
+    Instruments with no bars yet are backfilled over
+    ``PRICE_BAR_BACKFILL_PERIOD``. The last stored bar is fetched again so a
+    partial bar from a previous intraday sync gets its final values.
+    Instruments sharing the same last date are fetched in one batch.
+    Returns the number of bars written.
+    """
+    instruments = list(instruments)
+    by_start = _group_by_last_date(instruments, dict(_last_dates(instruments)))
+
+    written = 0
+    for start, group in by_start.items():
+        histories = marketdata.get_histories(
+            [inst.symbol for inst in group],
+            period=settings.PRICE_BAR_BACKFILL_PERIOD,
+            refresh=refresh,
+            start=start,
+        )
+        bars = _bars_for(group, histories)
+        if bars:
+            save_bars(bars)
+            written += len(bars)
+    return written
+
+
+async def async_sync_bars(instruments, refresh=False):
+    """``sync_bars`` for async views: every group is downloaded concurrently."""
+    instruments = list(instruments)
+    last_dates = {inst_id: last async for inst_id, last in _last_dates(instruments)}
+    groups = list(_group_by_last_date(instruments, last_dates).items())
+
+    results = await asyncio.gather(*(
+        marketdata.aget_histories(
+            [inst.symbol for inst in group],
+            period=settings.PRICE_BAR_BACKFILL_PERIOD,
+            refresh=refresh,
+            start=start,
+        )
+        for start, group in groups
+    ))
+    bars = [bar for (_, group), histories in zip(groups, results) for bar in _bars_for(group, histories)]
+    if bars:
+        await sync_to_async(save_bars)(bars)
+    return len(bars)
+
+
+def close_series(instruments, days=30):
+    """Return ``{symbol: (dates, closes)}`` for the last ``days`` days in one query."""
+    since = date.today() - timedelta(days=days)
+    rows = (
+        PriceBar.objects.filter(instrument__in=instruments, date__gte=since)
+        .order_by("instrument__symbol", "date")
+        .values_list("instrument__symbol", "date", "close")
+    )
+
+    series = {}
+    for symbol, day, close in rows:
+        dates, closes = series.setdefault(symbol, ([], []))
+        dates.append(day.strftime("%Y-%m-%d"))
+        closes.append(round(float(close), 2))
+    return series
+
+
+def close_matrix(instruments, start, end):
+    """Closes on a shared date axis: ``(dates, {symbol: [close or None, ...]})``.
+
+    Every symbol's list lines up with ``dates``; days a symbol has no bar
+    are ``None``.
+    """
+    rows = list(
+        PriceBar.objects.filter(instrument__in=instruments, date__range=(start, end))
+        .order_by("date")
+        .values_list("instrument__symbol", "date", "close")
+    )
+
+    dates = sorted({day for _, day, _ in rows})
+    position = {day: i for i, day in enumerate(dates)}
+    series = {inst.symbol: [None] * len(dates) for inst in instruments}
+    for symbol, day, close in rows:
+        series[symbol][position[day]] = round(float(close), 2)
+
+    return [day.strftime("%Y-%m-%d") for day in dates], series
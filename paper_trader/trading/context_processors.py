@@ -0,0 +1,6 @@
+from . import marketdata
+
+
+def market_data(request):
+    """Expose the vendor circuit breaker's state for the navbar indicator."""
+    return {"market_data_status": marketdata.breaker.state}
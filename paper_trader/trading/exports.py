@@ -0,0 +1,212 @@
+"""Constant-memory export and import of transactions and snapshots.
+
+Rows are read in primary-key order, ``EXPORT_CHUNK_SIZE`` at a time, each
+batch seeking past the last key of the one before. That works the same
+on every backend. ``.iterator()`` does not: MySQL's driver buffers the
+whole result set client-side. Each batch becomes one chunk of CSV text
+or one Parquet row group, and the chunk is written out before the next
+batch is read.
+
+Parquet needs ``pyarrow``, which is optional; ``ParquetUnavailable`` is
+raised when it isn't installed.
+"""
+
+import csv
+import io
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+from django.db.models import F
+
+from .models import PortfolioSnapshot, Transaction
+
+FORMATS = ("csv", "parquet")
+CONTENT_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+class ParquetUnavailable(Exception):
+    """Raised for Parquet work when ``pyarrow`` isn't installed."""
+
+
+# kind -> (model, [(column, lookup, parquet type), ...])
+EXPORTS = {
+    "transactions": (Transaction, [
+        ("timestamp", "timestamp", "timestamp"),
+        ("symbol", "instrument__symbol", "string"),
+        ("type", "type", "string"),
+        ("quantity", "quantity", "decimal:12:4"),
+        ("price", "price", "decimal:12:2"),
+        ("epoch", "epoch", "int"),
+    ]),
+    "snapshots": (PortfolioSnapshot, [
+        ("timestamp", "timestamp", "timestamp"),
+        ("date", "date", "date"),
+        ("granularity", "granularity", "string"),
+        ("total_value", "total_value", "decimal:12:2"),
+        ("epoch", "epoch", "int"),
+    ]),
+}
+USERNAME = ("username", "portfolio__user__username", "string")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ParquetUnavailable("Parquet needs pyarrow; install it with `pip install pyarrow`.")
+    return pyarrow
+
+
+def columns_for(kind, portfolio=None):
+    """The columns exported for ``kind``; every portfolio's rows also carry the username."""
+    _, columns = EXPORTS[kind]
+    return columns if portfolio is not None else [USERNAME, *columns]
+
+
+def batches(kind, portfolio=None, size=5000):
+    """Yield lists of value tuples for ``kind`` since each portfolio's last reset.
+
+    Only one batch is held in memory at a time.
+    """
+    model, _ = EXPORTS[kind]
+    lookups = [lookup for _, lookup, _ in columns_for(kind, portfolio)]
+    rows = model.objects.filter(epoch=F("portfolio__epoch")).order_by("pk")
+    if portfolio is not None:
+        rows = rows.filter(portfolio=portfolio)
+
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last).values_list("pk", *lookups)[:size])
+        if not batch:
+            return
+        last = batch[-1][0]
+        yield [row[1:] for row in batch]
+
+
+def _text(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(columns, rows):
+    """A header line, then one block of CSV text per batch in ``rows``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in columns])
+    for batch in rows:
+        writer.writerows([_text(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # just the header: there were no rows
+
+
+class _Sink:
+    """A write-only file that hands its bytes back through ``drain``."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(pa, name):
+    if name == "timestamp":
+        return pa.timestamp("us", tz="UTC")
+    if name == "date":
+        return pa.date32()
+    if name == "int":
+        return pa.int64()
+    if name.startswith("decimal:"):
+        _, precision, scale = name.split(":")
+        return pa.decimal128(int(precision), int(scale))
+    return pa.string()
+
+
+def parquet_chunks(columns, rows):
+    """The bytes of one Parquet file, yielded a row group (one batch) at a time."""
+    pa = _pyarrow()
+    schema = pa.schema([(name, _arrow_type(pa, kind)) for name, _, kind in columns])
+    sink = _Sink()
+    writer = pa.parquet.ParquetWriter(sink, schema)
+    try:
+        for batch in rows:
+            values = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(values, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()  # the footer
+
+
+def chunks(kind, fmt, portfolio=None, size=5000):
+    """Encoded chunks (``str`` for CSV, ``bytes`` for Parquet) of a whole export.
+
+    Raises ``ParquetUnavailable`` here, before anything is sent, rather
+    than partway through the stream.
+    """
+    columns = columns_for(kind, portfolio)
+    if fmt == "parquet":
+        _pyarrow()
+    encode = parquet_chunks if fmt == "parquet" else csv_chunks
+    return encode(columns, batches(kind, portfolio, size))
+
+
+async def achunks(chunks):
+    """Drive a sync chunk generator from a worker thread, one chunk per hop.
+
+    ``StreamingHttpResponse`` would otherwise read a sync iterator to the
+    end before sending anything under ASGI.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    sentinel = object()
+    while (chunk := await step(chunks, sentinel)) is not sentinel:
+        yield chunk
+
+
+def read_rows(path, fmt, batch_size=5000):
+    """Yield ``(line, {column: text})`` from a CSV or Parquet file without loading it all.
+
+    ``line`` is the CSV line number, or the row number for Parquet, for
+    error messages.
+    """
+    if fmt == "parquet":
+        pq = _pyarrow().parquet
+        number = 1
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            for row in batch.to_pylist():
+                number += 1
+                yield number, {name: _text(value) for name, value in row.items()}
+        return
+
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
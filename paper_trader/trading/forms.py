@@ -1,8 +1,17 @@
 from django import forms
 
+from .models import Order, Transaction
+
 class BuyForm(forms.Form):
     quantity = forms.DecimalField(
         min_value=0.0001, 
         decimal_places=4, 
         label='Quantity to Buy'
-    )
\ No newline at end of file
+    )
+
+
+class OrderForm(forms.Form):
+    side = forms.ChoiceField(choices=Transaction.TYPE_CHOICES)
+    kind = forms.ChoiceField(choices=Order.KIND_CHOICES, label='Type')
+    quantity = forms.DecimalField(min_value=0.0001, decimal_places=4)
+    trigger_price = forms.DecimalField(min_value=0.01, decimal_places=2, label='Limit / Stop Price')
@@ -0,0 +1,48 @@
+"""Average-cost position accounting shared by order execution and rebuilds.
+
+The functions work on anything with ``quantity``, ``average_cost``,
+``total_cost`` and ``realized_pnl`` attributes: ``Holding`` rows when
+orders execute, and plain ``Position`` objects when ``rebuild_ledger``
+replays transactions.
+"""
+
+from decimal import Decimal
+
+CENT = Decimal("0.01")
+COST_PLACES = Decimal("0.0001")
+ZERO = Decimal("0")
+
+
+class Position:
+    __slots__ = ("quantity", "average_cost", "total_cost", "realized_pnl")
+
+    def __init__(self):
+        self.quantity = ZERO
+        self.average_cost = ZERO
+        self.total_cost = ZERO
+        self.realized_pnl = ZERO
+
+
+def apply_buy(position, quantity, price):
+    """Add ``quantity`` at ``price``; returns the cost basis added."""
+    cost = (quantity * price).quantize(CENT)
+    position.quantity += quantity
+    position.total_cost += cost
+    position.average_cost = (position.total_cost / position.quantity).quantize(COST_PLACES)
+    return cost
+
+
+def apply_sell(position, quantity, price):
+    """Remove ``quantity`` at ``price``; returns ``(realized P&L, cost basis removed)``."""
+    if quantity >= position.quantity:
+        cost = position.total_cost
+    else:
+        cost = (position.total_cost * quantity / position.quantity).quantize(CENT)
+    realized = (quantity * price).quantize(CENT) - cost
+
+    position.quantity -= quantity
+    position.total_cost -= cost
+    position.realized_pnl += realized
+    if position.quantity == 0:
+        position.average_cost = ZERO
+    return realized, cost
@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from trading.backtest import DEFAULTS, run_backtest, save_result, sweep
+from trading.models import Instrument
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",")]
+
+
+def float_list(value):
+    return [float(v) for v in value.split(",")]
+
+
+class Command(BaseCommand):
+    help = "Backtest the moving-average crossover strategy on stored daily bars"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", help="Comma-separated symbols (default: every instrument)")
+        parser.add_argument("--start", type=date.fromisoformat, help="YYYY-MM-DD (default: 10 years ago)")
+        parser.add_argument("--end", type=date.fromisoformat, help="YYYY-MM-DD (default: today)")
+        parser.add_argument("--cash", type=Decimal, default=Decimal("10000.00"), help="Starting cash")
+        parser.add_argument("--fast", type=int_list, default=[DEFAULTS["fast"]], help="Fast window(s), e.g. 10,20")
+        parser.add_argument("--slow", type=int_list, default=[DEFAULTS["slow"]], help="Slow window(s), e.g. 50,100")
+        parser.add_argument(
+            "--position-size",
+            type=float_list,
+            default=[DEFAULTS["position_size"]],
+            help="Fraction(s) of equity per new position",
+        )
+        parser.add_argument("--workers", type=int, help="Processes for parameter sweeps (default: one per CPU)")
+        parser.add_argument("--save", action="store_true", help="Store the results and their trades")
+
+    def handle(self, *args, **options):
+        end = options["end"] or date.today()
+        start = options["start"] or end - timedelta(days=3652)
+        if options["symbols"]:
+            symbols = [s.strip().upper() for s in options["symbols"].split(",") if s.strip()]
+        else:
+            symbols = list(Instrument.objects.order_by("symbol").values_list("symbol", flat=True))
+        if not symbols:
+            raise CommandError("No symbols to backtest.")
+
+        grid = {"fast": options["fast"], "slow": options["slow"], "position_size": options["position_size"]}
+        if all(len(values) == 1 for values in grid.values()):
+            params = {name: values[0] for name, values in grid.items()}
+            results = [run_backtest(symbols, start, end, cash=options["cash"], **params)]
+        else:
+            results = sweep(symbols, start, end, grid, workers=options["workers"], cash=options["cash"])
+
+        for result in results:
+            metrics = result.metrics
+            self.stdout.write(
+                f"fast={result.params['fast']} slow={result.params['slow']} "
+                f"size={result.params['position_size']}: final ${result.final_value:,.2f}, "
+                f"{len(result.trades)} trades, return {self._pct(metrics.get('time_weighted_return'))}, "
+                f"max drawdown {self._pct(metrics.get('max_drawdown'))}, sharpe {metrics.get('sharpe')}"
+            )
+            if options["save"]:
+                save_result(result, symbols, start, end, cash=options["cash"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backtested {len(results)} parameter set(s) over {len(symbols)} symbols from {start} to {end}"
+        ))
+
+    def _pct(self, value):
+        return "n/a" if value is None else f"{value * 100:.2f}%"
@@ -0,0 +1,295 @@
+import json
+import platform
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import django
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from trading import marketdata
+from trading.bars import last_session
+from trading.marketdata.local import DelayedProvider
+from trading.models import Holding, Instrument, PortfolioSnapshot, PriceBar, Transaction
+from trading.orders import OrderService
+
+# Results are compared on these; lower is better for all but throughput
+VIEW_METRICS = ["p50_ms", "p95_ms", "peak_memory_kb"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure view latency, query counts, memory and order throughput on a synthetic "
+        "dataset behind a fake slow vendor; everything is rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--instruments", type=int, default=200, help="Instruments in the dataset")
+        parser.add_argument("--holdings", type=int, default=50, help="Open positions in the benchmark portfolio")
+        parser.add_argument("--transactions", type=int, default=5000, help="Past trades in the portfolio")
+        parser.add_argument("--snapshots", type=int, default=365, help="Days of snapshots and daily bars")
+        parser.add_argument("--iterations", type=int, default=20, help="Timed requests per view and mode")
+        parser.add_argument("--orders", type=int, default=200, help="Buys and sells timed for throughput")
+        parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake vendor takes per call")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, so datasets are identical")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--compare", help="Baseline JSON from an earlier run to check against")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Allowed slowdown versus the baseline as a fraction, e.g. 0.2 for 20%%",
+        )
+
+    def handle(self, *args, **options):
+        if options["holdings"] > options["instruments"]:
+            raise CommandError("--holdings can't exceed --instruments.")
+        baseline = self.load_baseline(options["compare"]) if options["compare"] else None
+        self.rng = random.Random(options["seed"])
+
+        # A private cache, so clearing it between cold runs never touches a shared one
+        with override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark"}},
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            MARKET_DATA_USE_STORED_PRICES=False,
+        ):
+            marketdata.use_provider(DelayedProvider(latency=options["latency"]))
+            try:
+                with transaction.atomic():
+                    user, instruments = self.build_dataset(options)
+                    results = self.run(user, instruments, options)
+                    transaction.set_rollback(True)  # leave the database as it was
+            finally:
+                marketdata.reset()
+
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options["threshold"])
+            for line in regressions:
+                self.stderr.write(line)
+            if regressions:
+                raise CommandError(
+                    f"{len(regressions)} regressions beyond {options['threshold']:.0%} of {options['compare']}."
+                )
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}."))
+
+    def load_baseline(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Can't read baseline {path}: {exc}")
+
+    def build_dataset(self, options):
+        rng = self.rng
+        tag = uuid.uuid4().hex[:4].upper()  # keeps the symbols clear of real instruments
+        Instrument.objects.bulk_create(
+            Instrument(
+                symbol=f"B{tag}{i:05d}",
+                name=f"Benchmark {i}",
+                current_price=Decimal(rng.randint(10, 500)),
+            )
+            for i in range(options["instruments"])
+        )
+        # bulk_create leaves pks unset on some backends
+        instruments = list(Instrument.objects.filter(symbol__startswith=f"B{tag}").order_by("symbol"))
+
+        days = pd.bdate_range(end=last_session(), periods=options["snapshots"]).date
+        bars = []
+        for inst in instruments:
+            closes = float(inst.current_price) * np.cumprod(1 + np.array([rng.gauss(0, 0.01) for _ in days]))
+            for day, close in zip(days, closes):
+                price = Decimal(str(round(close, 4)))
+                bars.append(PriceBar(instrument=inst, date=day, open=price, high=price, low=price, close=price))
+        PriceBar.objects.bulk_create(bars, batch_size=2000)
+
+        user = get_user_model().objects.create_user(f"benchmark-{tag.lower()}")
+        portfolio = user.portfolio
+        held = instruments[:options["holdings"]]
+        Holding.objects.bulk_create(
+            Holding(
+                portfolio=portfolio,
+                instrument=inst,
+                quantity=Decimal(rng.randint(1, 100)),
+                average_cost=inst.current_price,
+                total_cost=inst.current_price,
+            )
+            for inst in held
+        )
+        Transaction.objects.bulk_create(
+            (
+                Transaction(
+                    portfolio=portfolio,
+                    instrument=rng.choice(held or instruments),
+                    type=rng.choice([Transaction.BUY, Transaction.SELL]),
+                    quantity=Decimal(rng.randint(1, 50)),
+                    price=Decimal(rng.randint(10, 500)),
+                    epoch=portfolio.epoch,
+                )
+                for _ in range(options["transactions"])
+            ),
+            batch_size=2000,
+        )
+
+        value = 10000.0
+        snapshots = []
+        for day in days:
+            value *= 1 + rng.gauss(0, 0.01)
+            snapshots.append(PortfolioSnapshot(
+                portfolio=portfolio,
+                date=day,
+                timestamp=datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc),
+                total_value=Decimal(str(round(value, 2))),
+                epoch=portfolio.epoch,
+            ))
+        PortfolioSnapshot.objects.bulk_create(snapshots, batch_size=2000)
+
+        # Enough cash that every timed buy goes through
+        portfolio.cash_balance = Decimal("1000000.00")
+        portfolio.save(update_fields=["cash_balance"])
+        return user, instruments
+
+    def run(self, user, instruments, options):
+        client = Client()
+        client.force_login(user)
+        symbol = instruments[0].symbol
+        urls = {
+            "instrument_list": reverse("instrument_list"),
+            "instrument_detail": reverse("instrument_detail", args=[symbol]),
+            "portfolio": reverse("portfolio"),
+            "portfolio_analytics_api": reverse("portfolio_analytics_api"),
+            "history_api": reverse("history_api"),
+        }
+
+        views = {}
+        for name, url in urls.items():
+            # Cold: every cache empty, so each request waits on the fake vendor
+            views[f"{name}:cold"] = self.measure_view(client, url, options["iterations"], cold=True)
+            views[f"{name}:warm"] = self.measure_view(client, url, options["iterations"], cold=False)
+
+        return {
+            "created": datetime.now(dt_timezone.utc).isoformat(timespec="seconds"),
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+            },
+            "scale": {
+                name: options[name]
+                for name in ("instruments", "holdings", "transactions", "snapshots", "iterations", "orders", "latency")
+            },
+            "views": views,
+            "trading": self.measure_trading(user.portfolio, instruments[0], options["orders"]),
+        }
+
+    def cold_caches(self):
+        cache.clear()
+        marketdata.quote_cache.clear()
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+
+    def measure_view(self, client, url, iterations, cold):
+        if not cold:
+            self.request(client, url)  # fill the caches
+        timings, queries = [], []
+        for _ in range(iterations):
+            if cold:
+                self.cold_caches()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.request(client, url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # Tracing slows everything down, so memory gets a run of its own
+        if cold:
+            self.cold_caches()
+        tracemalloc.start()
+        try:
+            self.request(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {**percentiles(timings), "queries": max(queries), "peak_memory_kb": round(peak / 1024, 1)}
+
+    def measure_trading(self, portfolio, instrument, count):
+        service = OrderService(portfolio)
+        price = instrument.current_price
+        results = {}
+        for side, execute in (("buy", service.buy), ("sell", service.sell)):
+            timings = []
+            for _ in range(count):
+                started = time.perf_counter()
+                result = execute(instrument, 1, price)
+                timings.append((time.perf_counter() - started) * 1000)
+                if not result.success:
+                    raise CommandError(f"Benchmark {side} failed: {result.message}")
+            results[side] = {**percentiles(timings), "ops_per_sec": round(count / (sum(timings) / 1000), 1)}
+        return results
+
+    def report(self, results):
+        self.stdout.write(f"{'view':<34}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'peak KB':>10}")
+        for name, stats in results["views"].items():
+            self.stdout.write(
+                f"{name:<34}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                f"{stats['queries']:>9}{stats['peak_memory_kb']:>10.1f}"
+            )
+        for side, stats in results["trading"].items():
+            self.stdout.write(f"{side:<34}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}  {stats['ops_per_sec']} ops/s")
+
+
+def percentiles(timings):
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(np.mean(timings)), 3),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Describe every metric that got worse than ``baseline`` by more than ``threshold``.
+
+    Query counts are exact, so any increase is a regression.
+    """
+    if baseline.get("scale") != results["scale"]:
+        raise CommandError("The baseline was run at a different scale; rerun it with the same options.")
+
+    regressions = []
+    for name, stats in results["views"].items():
+        old = baseline["views"].get(name)
+        if old is None:
+            continue
+        for metric in VIEW_METRICS:
+            if stats[metric] > old[metric] * (1 + threshold):
+                regressions.append(f"{name} {metric}: {old[metric]} -> {stats[metric]}")
+        if stats["queries"] > old["queries"]:
+            regressions.append(f"{name} queries: {old['queries']} -> {stats['queries']}")
+
+    for side, stats in results["trading"].items():
+        old = baseline["trading"].get(side)
+        if old is not None and stats["ops_per_sec"] < old["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"{side} ops_per_sec: {old['ops_per_sec']} -> {stats['ops_per_sec']}")
+    return regressions
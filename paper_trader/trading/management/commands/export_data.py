@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from trading import exports
+from trading.models import Portfolio
+
+
+class Command(BaseCommand):
+    help = "Write transactions or snapshots since each portfolio's last reset as CSV or Parquet, in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(exports.EXPORTS), help="What to export")
+        parser.add_argument("--format", choices=exports.FORMATS, default="csv", help="Output format")
+        parser.add_argument("--output", help="File to write; CSV goes to stdout when omitted")
+        parser.add_argument("--user", help="Only this user's portfolio (default: every portfolio, with a username column)")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.EXPORT_CHUNK_SIZE,
+            help="Rows fetched per query and written per chunk",
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"]
+        if fmt == "parquet" and not options["output"]:
+            raise CommandError("Parquet needs --output.")
+
+        portfolio = None
+        if options["user"]:
+            portfolio = Portfolio.objects.filter(user__username=options["user"]).first()
+            if portfolio is None:
+                raise CommandError(f"No portfolio for user {options['user']}.")
+
+        try:
+            chunks = exports.chunks(options["kind"], fmt, portfolio, options["chunk_size"])
+        except exports.ParquetUnavailable as exc:
+            raise CommandError(str(exc))
+
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        if fmt == "parquet":
+            f = open(options["output"], "wb")
+        else:
+            f = open(options["output"], "w", newline="")
+        with f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported {options['kind']} to {options['output']}."))
@@ -0,0 +1,116 @@
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from trading.ledger import ZERO, Position, apply_buy, apply_sell
+from trading.models import Holding, Instrument, Portfolio, Transaction
+from trading.orders import STARTING_CASH
+
+
+class Command(BaseCommand):
+    help = "Create N users with M trades each, for measuring per-request cost at scale"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100, help="Number of users to create")
+        parser.add_argument("--trades", type=int, default=20, help="Trades per user")
+        parser.add_argument("--instruments", type=int, default=20, help="Instruments to trade (created if missing)")
+        parser.add_argument("--prefix", default="loadtest", help="Username prefix")
+        parser.add_argument("--password", default="loadtest", help="Password shared by every generated user")
+        parser.add_argument("--batch-size", type=int, default=500, help="Users written per database round-trip")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, so runs are reproducible")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Users starting with '{prefix}' already exist; pick another --prefix.")
+
+        self.rng = random.Random(options["seed"])
+        self.instruments = self.load_instruments(options["instruments"])
+        if not self.instruments:
+            raise CommandError("No priced instruments to trade.")
+        self.by_id = {inst.id: inst for inst in self.instruments}
+        password = make_password(options["password"])  # hashing is slow; do it once
+
+        created = 0
+        batch_size = options["batch_size"]
+        for offset in range(0, options["users"], batch_size):
+            count = min(batch_size, options["users"] - offset)
+            names = [f"{prefix}{offset + i:06d}" for i in range(count)]
+            with transaction.atomic():
+                self.create_batch(User, names, password, options["trades"])
+            created += count
+            self.stdout.write(f"{created}/{options['users']} users")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} users with {options['trades']} trades each "
+            f"(password '{options['password']}')."
+        ))
+
+    def load_instruments(self, count):
+        instruments = list(Instrument.objects.order_by("symbol")[:count])
+        missing = [
+            Instrument(symbol=f"LOAD{i}", name=f"Load Test {i}", current_price=Decimal(self.rng.randint(10, 500)))
+            for i in range(len(instruments), count)
+        ]
+        if missing:
+            Instrument.objects.bulk_create(missing, ignore_conflicts=True)
+            instruments = list(Instrument.objects.order_by("symbol")[:count])
+        return [inst for inst in instruments if inst.current_price]
+
+    def create_batch(self, User, names, password, trades):
+        User.objects.bulk_create(User(username=name, password=password) for name in names)
+        users = User.objects.filter(username__in=names).order_by("username")
+        Portfolio.objects.bulk_create(Portfolio(user=user) for user in users)
+        portfolios = list(Portfolio.objects.filter(user__username__in=names))
+
+        transactions, holdings = [], []
+        for portfolio in portfolios:
+            positions = defaultdict(Position)
+            for _ in range(trades):
+                transactions.append(self.random_trade(portfolio, positions))
+            for inst_id, position in positions.items():
+                if position.quantity > 0:
+                    holdings.append(Holding(
+                        portfolio=portfolio,
+                        instrument_id=inst_id,
+                        quantity=position.quantity,
+                        average_cost=position.average_cost,
+                        total_cost=position.total_cost,
+                        realized_pnl=position.realized_pnl,
+                    ))
+            portfolio.total_cost = sum((p.total_cost for p in positions.values()), ZERO)
+            portfolio.realized_pnl = sum((p.realized_pnl for p in positions.values()), ZERO)
+
+        Transaction.objects.bulk_create(transactions, batch_size=2000)
+        Holding.objects.bulk_create(holdings, batch_size=2000)
+        Portfolio.objects.bulk_update(portfolios, ["cash_balance", "total_cost", "realized_pnl"])
+
+    def random_trade(self, portfolio, positions):
+        """A buy the portfolio can afford, or a sell of part of an open position."""
+        budget = min(portfolio.cash_balance, STARTING_CASH / 20)
+        open_ids = [inst_id for inst_id, p in positions.items() if p.quantity > 0]
+        if open_ids and (self.rng.random() < 0.3 or budget < STARTING_CASH / 40):
+            instrument = self.by_id[self.rng.choice(open_ids)]
+            price = self.jitter(instrument.current_price)
+            quantity = Decimal(self.rng.randint(1, int(positions[instrument.id].quantity)))
+            apply_sell(positions[instrument.id], quantity, price)
+            portfolio.cash_balance += quantity * price
+            side = Transaction.SELL
+        else:
+            instrument = self.rng.choice(self.instruments)
+            price = self.jitter(instrument.current_price)
+            quantity = Decimal(max(int(budget // price), 1))
+            apply_buy(positions[instrument.id], quantity, price)
+            portfolio.cash_balance -= quantity * price
+            side = Transaction.BUY
+
+        return Transaction(portfolio=portfolio, instrument=instrument, type=side, quantity=quantity, price=price)
+
+    def jitter(self, price):
+        return (price * Decimal(str(self.rng.uniform(0.9, 1.1)))).quantize(Decimal("0.01"))
@@ -0,0 +1,198 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from trading import exports, pagecache, search
+from trading.ledger import ZERO, Position, apply_buy, apply_sell
+from trading.models import Holding, Instrument, Portfolio, Transaction
+
+PORTFOLIO_CHUNK = 500  # portfolio ids per query, well under SQLite's parameter limit
+
+
+class Command(BaseCommand):
+    help = (
+        "Load transactions from a CSV or Parquet file (e.g. one written by export_data) with batched "
+        "inserts, then rebuild the holdings of every portfolio touched in one pass"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File with timestamp, symbol, type, quantity and price columns")
+        parser.add_argument(
+            "--user",
+            help="Load every row into this user's portfolio; otherwise each row needs a username column",
+        )
+        parser.add_argument("--format", choices=exports.FORMATS, help="File format (default: from the extension)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows inserted per statement")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+        if fmt not in exports.FORMATS:
+            raise CommandError(f"Can't tell the format of {path}; pass --format.")
+        if not path.exists():
+            raise CommandError(f"No such file: {path}")
+
+        self.batch_size = options["batch_size"]
+        self.portfolios = {}  # username -> Portfolio
+        self.instruments = {}  # symbol -> id
+        self.cash_flows = defaultdict(Decimal)  # portfolio id -> net cash from the imported trades
+        default = self.portfolio_for(options["user"]) if options["user"] else None
+
+        try:
+            with transaction.atomic():
+                imported = self.load(exports.read_rows(path, fmt, self.batch_size), default)
+                for portfolio_id, flow in self.cash_flows.items():
+                    Portfolio.objects.filter(pk=portfolio_id).update(cash_balance=F("cash_balance") + flow)
+                rebuilt = self.rebuild(sorted(self.cash_flows))
+        except exports.ParquetUnavailable as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} transactions. Rebuilt holdings for {rebuilt} portfolios."
+        ))
+
+    def portfolio_for(self, username):
+        portfolio = self.portfolios.get(username)
+        if portfolio is None:
+            user = get_user_model().objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"No user named {username}.")
+            portfolio, _ = Portfolio.objects.get_or_create(user=user)
+            self.portfolios[username] = portfolio
+        return portfolio
+
+    def load(self, rows, default):
+        imported = 0
+        pending = []
+        for line, row in rows:
+            pending.append(self.parse(line, row, default))
+            if len(pending) >= self.batch_size:
+                imported += self.insert(pending)
+                pending = []
+        if pending:
+            imported += self.insert(pending)
+        return imported
+
+    def parse(self, line, row, default):
+        """Validate one row into ``(portfolio, symbol, type, quantity, price, timestamp)``."""
+        try:
+            if default is not None:
+                portfolio = default
+            elif row.get("username"):
+                portfolio = self.portfolio_for(row["username"])
+            else:
+                raise ValueError("no username; pass --user")
+
+            symbol = (row.get("symbol") or "").strip().upper()
+            if not symbol:
+                raise ValueError("no symbol")
+            side = (row.get("type") or "").strip().upper()
+            if side not in (Transaction.BUY, Transaction.SELL):
+                raise ValueError(f"type must be {Transaction.BUY} or {Transaction.SELL}")
+            quantity = Decimal(str(row.get("quantity")).strip())
+            price = Decimal(str(row.get("price")).strip())
+            if quantity <= 0 or price < 0:
+                raise ValueError("quantity must be positive and price not negative")
+
+            timestamp = datetime.fromisoformat(str(row.get("timestamp")).strip())
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp)
+        except (ValueError, InvalidOperation) as exc:
+            raise CommandError(f"Line {line}: {exc}")
+        return portfolio, symbol, side, quantity, price, timestamp
+
+    def insert(self, parsed):
+        missing = {symbol for _, symbol, *_ in parsed} - self.instruments.keys()
+        if missing:
+            self.resolve_instruments(missing, parsed)
+
+        transactions = []
+        for portfolio, symbol, side, quantity, price, timestamp in parsed:
+            transactions.append(Transaction(
+                portfolio=portfolio,
+                instrument_id=self.instruments[symbol],
+                type=side,
+                quantity=quantity,
+                price=price,
+                timestamp=timestamp,
+                epoch=portfolio.epoch,
+            ))
+            amount = quantity * price
+            self.cash_flows[portfolio.pk] += amount if side == Transaction.SELL else -amount
+        Transaction.objects.bulk_create(transactions, batch_size=self.batch_size)
+        return len(transactions)
+
+    def resolve_instruments(self, symbols, parsed):
+        """Look ``symbols`` up, creating any the database doesn't have yet at their first imported price."""
+        found = dict(Instrument.objects.filter(symbol__in=symbols).values_list("symbol", "pk"))
+        new = symbols - found.keys()
+        if new:
+            prices = {}
+            for _, symbol, _, _, price, _ in parsed:
+                prices.setdefault(symbol, price)
+            Instrument.objects.bulk_create(
+                Instrument(symbol=symbol, name=symbol, current_price=prices[symbol]) for symbol in new
+            )
+            # bulk_create leaves pks unset on some backends
+            found.update(Instrument.objects.filter(symbol__in=new).values_list("symbol", "pk"))
+            search.invalidate()
+            pagecache.bump(new)
+        self.instruments.update(found)
+
+    def rebuild(self, portfolio_ids):
+        """Replace the holdings of ``portfolio_ids`` with a replay of their transactions.
+
+        Transactions are read once, ordered by portfolio and time, so only
+        one portfolio's positions are in memory at a time.
+        """
+        for start in range(0, len(portfolio_ids), PORTFOLIO_CHUNK):
+            chunk = portfolio_ids[start:start + PORTFOLIO_CHUNK]
+            rows = (
+                Transaction.objects.filter(portfolio_id__in=chunk, epoch=F("portfolio__epoch"))
+                .order_by("portfolio_id", "timestamp", "id")
+                .values_list("portfolio_id", "instrument_id", "type", "quantity", "price")
+                .iterator(chunk_size=self.batch_size)
+            )
+            portfolios = Portfolio.objects.in_bulk(chunk)
+            for portfolio_id, group in groupby(rows, key=itemgetter(0)):
+                self.replace_holdings(portfolios[portfolio_id], group)
+        return len(portfolio_ids)
+
+    def replace_holdings(self, portfolio, rows):
+        positions = defaultdict(Position)
+        for _, instrument_id, side, quantity, price in rows:
+            position = positions[instrument_id]
+            if side == Transaction.BUY:
+                apply_buy(position, quantity, price)
+            else:
+                if quantity > position.quantity:
+                    self.stderr.write(
+                        f"Portfolio {portfolio.pk}: sell of {quantity} exceeds position in instrument {instrument_id}"
+                    )
+                apply_sell(position, min(quantity, position.quantity), price)
+
+        Holding.objects.filter(portfolio=portfolio).delete()
+        Holding.objects.bulk_create(
+            Holding(
+                portfolio=portfolio,
+                instrument_id=instrument_id,
+                quantity=position.quantity,
+                average_cost=position.average_cost,
+                total_cost=position.total_cost,
+                realized_pnl=position.realized_pnl,
+            )
+            for instrument_id, position in positions.items()
+            if position.quantity > 0
+        )
+        portfolio.total_cost = sum((p.total_cost for p in positions.values()), ZERO)
+        portfolio.realized_pnl = sum((p.realized_pnl for p in positions.values()), ZERO)
+        portfolio.save(update_fields=["total_cost", "realized_pnl"])
@@ -0,0 +1,61 @@
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from trading import marketdata
+from trading.matching import MatchingEngine, fill_order
+from trading.models import Instrument, Order
+
+
+class Command(BaseCommand):
+    help = "Fill resting limit and stop orders as prices move"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Evaluate a single price tick and exit")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.ORDER_MATCH_INTERVAL,
+            help="Seconds between price ticks",
+        )
+
+    def handle(self, *args, **options):
+        engine = MatchingEngine()
+        while True:
+            started = time.monotonic()
+            engine.load()
+            filled = rejected = 0
+
+            for symbol, price in self.prices(engine.symbols()).items():
+                for order in engine.on_price(symbol, price):
+                    order = fill_order(order, price)
+                    if order is None:
+                        continue
+                    if order.status == Order.FILLED:
+                        filled += 1
+                    else:
+                        rejected += 1
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(engine)} open orders; filled {filled}, rejected {rejected} in {elapsed:.2f}s"
+            ))
+
+            if options["once"]:
+                break
+            time.sleep(max(0, options["interval"] - elapsed))
+
+    def prices(self, symbols):
+        if not symbols:
+            return {}
+        if settings.MARKET_DATA_USE_STORED_PRICES:
+            return dict(Instrument.objects.filter(symbol__in=symbols).values_list("symbol", "current_price"))
+
+        quotes, _ = marketdata.get_quotes(symbols)
+        return {
+            symbol: Decimal(str(quote.price))
+            for symbol, quote in quotes.items()
+            if quote.price is not None
+        }
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from trading.models import PortfolioSnapshot, Transaction
+
+
+class Command(BaseCommand):
+    help = "Delete transactions and snapshots left behind by portfolio resets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows deleted per statement")
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches, to leave room for live traffic",
+        )
+
+    def handle(self, *args, **options):
+        for model in (Transaction, PortfolioSnapshot):
+            deleted = self.purge(model, options["batch_size"], options["pause"])
+            self.stdout.write(self.style.SUCCESS(f"Purged {deleted} {model._meta.verbose_name_plural}"))
+
+    def purge(self, model, batch_size, pause):
+        stale = model.objects.filter(epoch__lt=F("portfolio__epoch")).order_by("pk")
+        deleted = 0
+        while True:
+            ids = list(stale.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            # Nothing references these rows and no delete signals are connected,
+            # so the collector fast-deletes them in one DELETE by primary key
+            count, _ = model.objects.filter(pk__in=ids).delete()
+            deleted += count
+            if pause:
+                time.sleep(pause)
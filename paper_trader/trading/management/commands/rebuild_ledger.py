@@ -0,0 +1,106 @@
+from collections import defaultdict
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from trading.ledger import ZERO, Position, apply_buy, apply_sell
+from trading.models import Holding, Portfolio, Transaction
+
+HOLDING_FIELDS = ["average_cost", "total_cost", "realized_pnl"]
+PORTFOLIO_FIELDS = ["total_cost", "realized_pnl"]
+PORTFOLIO_CHUNK = 500  # portfolio ids per holdings query, well under SQLite's parameter limit
+
+
+class Command(BaseCommand):
+    help = "Recompute cost basis and realized P&L by replaying every transaction since the last reset"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report rows that disagree with the replay")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched per database round-trip")
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        chunk_size = options["chunk_size"]
+        self.pending_holdings = []
+        self.pending_portfolios = []
+        self.mismatches = 0
+
+        rows = (
+            Transaction.objects.filter(epoch=F("portfolio__epoch"))
+            .order_by("portfolio_id", "timestamp", "id")
+            .values_list("portfolio_id", "instrument_id", "type", "quantity", "price")
+            .iterator(chunk_size=chunk_size)
+        )
+        groups = groupby(rows, key=itemgetter(0))
+        current = next(groups, None)
+
+        # Merge the portfolio and transaction streams, both ordered by portfolio id.
+        # Holdings are read with one query per chunk of portfolios.
+        checked = 0
+        portfolios = Portfolio.objects.order_by("pk").iterator(chunk_size=chunk_size)
+        for chunk in iter(lambda: list(islice(portfolios, PORTFOLIO_CHUNK)), []):
+            holdings = defaultdict(list)
+            for holding in Holding.objects.filter(portfolio_id__in=[p.pk for p in chunk]):
+                holdings[holding.portfolio_id].append(holding)
+
+            for portfolio in chunk:
+                while current is not None and current[0] < portfolio.pk:
+                    current = next(groups, None)
+
+                positions = defaultdict(Position)
+                if current is not None and current[0] == portfolio.pk:
+                    self.replay(portfolio, current[1], positions)
+                    current = next(groups, None)
+
+                self.reconcile(portfolio, positions, holdings[portfolio.pk])
+                checked += 1
+                if len(self.pending_holdings) + len(self.pending_portfolios) >= chunk_size:
+                    self.flush()
+        self.flush()
+
+        verb = "Found" if self.dry_run else "Fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} portfolios. {verb} {self.mismatches} mismatches."))
+
+    def replay(self, portfolio, rows, positions):
+        for _, instrument_id, side, quantity, price in rows:
+            position = positions[instrument_id]
+            if side == Transaction.BUY:
+                apply_buy(position, quantity, price)
+            elif quantity > position.quantity:
+                self.stderr.write(f"Portfolio {portfolio.pk}: sell of {quantity} exceeds position in instrument {instrument_id}")
+                apply_sell(position, position.quantity, price)
+            else:
+                apply_sell(position, quantity, price)
+
+    def reconcile(self, portfolio, positions, holdings):
+        for holding in holdings:
+            position = positions.get(holding.instrument_id, Position())
+            if position.quantity != holding.quantity:
+                self.stderr.write(
+                    f"Portfolio {portfolio.pk}: holding {holding.pk} has {holding.quantity} shares, "
+                    f"transactions add up to {position.quantity}"
+                )
+            if any(getattr(holding, f) != getattr(position, f) for f in HOLDING_FIELDS):
+                self.mismatches += 1
+                for f in HOLDING_FIELDS:
+                    setattr(holding, f, getattr(position, f))
+                self.pending_holdings.append(holding)
+
+        total_cost = sum((p.total_cost for p in positions.values()), ZERO)
+        realized_pnl = sum((p.realized_pnl for p in positions.values()), ZERO)
+        if portfolio.total_cost != total_cost or portfolio.realized_pnl != realized_pnl:
+            self.mismatches += 1
+            portfolio.total_cost = total_cost
+            portfolio.realized_pnl = realized_pnl
+            self.pending_portfolios.append(portfolio)
+
+    def flush(self):
+        if not self.dry_run:
+            if self.pending_holdings:
+                Holding.objects.bulk_update(self.pending_holdings, HOLDING_FIELDS)
+            if self.pending_portfolios:
+                Portfolio.objects.bulk_update(self.pending_portfolios, PORTFOLIO_FIELDS)
+        self.pending_holdings = []
+        self.pending_portfolios = []
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from trading.bars import sync_bars
+from trading.models import Instrument
+from trading.pricing import refresh_instrument_prices
+
+
+class Command(BaseCommand):
+    help = "Keep instrument prices fresh in the database so views never wait on the data vendor"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Refresh a single time and exit")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.PRICE_REFRESH_INTERVAL,
+            help="Seconds between refresh passes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.MARKET_DATA_BATCH_SIZE,
+            help="Symbols fetched per upstream request",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            refreshed = refresh_instrument_prices(batch_size=options["batch_size"])
+            bars = sync_bars(Instrument.objects.all(), refresh=True)
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} prices and {bars} bars in {elapsed:.2f}s"))
+
+            if options["once"]:
+                break
+            time.sleep(max(0, options["interval"] - elapsed))
@@ -1,22 +1,102 @@
-from django.core.management.base import BaseCommand
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from trading import pagecache, search
 from trading.models import Instrument
 
+DEFAULT_INSTRUMENTS = [
+    {"name": "Apple", "symbol": "AAPL"},
+    {"name": "Tesla", "symbol": "TSLA"},
+    {"name": "Microsoft", "symbol": "MSFT"},
+]
+SYMBOL_LENGTH = Instrument._meta.get_field("symbol").max_length
+NAME_LENGTH = Instrument._meta.get_field("name").max_length
+
+
 class Command(BaseCommand):
-    help = "Seed the database with some default financial instruments"
-
-    def handle(self, *args, **kwargs):
-        instruments = [
-            {"name": "Apple", "symbol": "AAPL"},
-            {"name": "Tesla", "symbol": "TSLA"},
-            {"name": "Microsoft", "symbol": "MSFT"},
-        ]
-
-        for inst in instruments:
-            obj, created = Instrument.objects.get_or_create(
-                symbol=inst["symbol"],
-                defaults={"name": inst["name"], "current_price": 0.00}
-            )
-            if created:
-                self.stdout.write(self.style.SUCCESS(f"Added {inst['name']} ({inst['symbol']})"))
-            else:
-                self.stdout.write(self.style.WARNING(f"{inst['symbol']} already exists"))
\ No newline at end of file
+    help = (
+        "Load financial instruments from a CSV or JSON listing (symbol, name and optional price) "
+        "in bulk, or a few defaults when no file is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="CSV with symbol,name[,price] columns, or a JSON list of objects")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows written per statement")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rows = self.read(Path(options["path"])) if options["path"] else enumerate(DEFAULT_INSTRUMENTS, 1)
+        listing = self.validate(rows)
+
+        with transaction.atomic():
+            existing = {}
+            symbols = list(listing)
+            for start in range(0, len(symbols), batch_size):
+                chunk = symbols[start:start + batch_size]
+                existing.update((inst.symbol, inst) for inst in Instrument.objects.filter(symbol__in=chunk))
+
+            new = [
+                Instrument(symbol=symbol, name=name, current_price=price)
+                for symbol, (name, price) in listing.items()
+                if symbol not in existing
+            ]
+            # Rows another process added meanwhile are skipped rather than failing the load
+            Instrument.objects.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
+
+            renamed = []
+            for symbol, inst in existing.items():
+                if inst.name != listing[symbol][0]:
+                    inst.name = listing[symbol][0]
+                    renamed.append(inst)
+            Instrument.objects.bulk_update(renamed, ["name"], batch_size=batch_size)
+
+        # bulk writes skip the post_save signals that normally do this
+        if new or renamed:
+            search.invalidate()
+            pagecache.bump(inst.symbol for inst in [*new, *renamed])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {len(new)} instruments, renamed {len(renamed)}, "
+            f"{len(existing) - len(renamed)} already up to date."
+        ))
+
+    def read(self, path):
+        """Yield ``(line, {column: value})`` from a CSV or JSON listing."""
+        if not path.exists():
+            raise CommandError(f"No such file: {path}")
+        if path.suffix.lower() == ".json":
+            try:
+                data = json.loads(path.read_text())
+            except ValueError as exc:
+                raise CommandError(f"{path} is not valid JSON: {exc}")
+            if not isinstance(data, list):
+                raise CommandError(f"{path} must hold a list of {{\"symbol\": ..., \"name\": ...}} objects.")
+            yield from enumerate(data, 1)
+            return
+
+        with path.open(newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {key.strip().lower(): value for key, value in row.items() if key}
+
+    def validate(self, rows):
+        """``{symbol: (name, price)}``; a symbol listed twice keeps its last row."""
+        listing = {}
+        for line, row in rows:
+            try:
+                symbol = str(row.get("symbol") or "").strip().upper()
+                name = str(row.get("name") or "").strip()
+                price = Decimal(str(row.get("price") or 0).strip())
+            except (AttributeError, InvalidOperation):
+                raise CommandError(f"Line {line}: expected symbol, name and an optional numeric price.")
+            if not symbol or len(symbol) > SYMBOL_LENGTH:
+                raise CommandError(f"Line {line}: symbol must be 1 to {SYMBOL_LENGTH} characters.")
+            if len(name) > NAME_LENGTH:
+                raise CommandError(f"Line {line}: name is longer than {NAME_LENGTH} characters.")
+            listing[symbol] = (name or symbol, price)
+        return listing
@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from trading.snapshots import compact_snapshots, take_snapshots
+from trading.valuation import refresh_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Record portfolio values on a fixed schedule, re-rank the leaderboard "
+        "and compact old intraday snapshots"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Take a single snapshot and exit")
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.SNAPSHOT_INTERVAL,
+            help="Snapshot granularity in seconds (86400 for daily)",
+        )
+        parser.add_argument(
+            "--keep-intraday-days",
+            type=int,
+            default=settings.SNAPSHOT_INTRADAY_RETENTION_DAYS,
+            help="Days of intraday snapshots to keep before compacting them into daily rows",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            started = time.monotonic()
+            valued = take_snapshots(interval)
+            cutoff = timezone.localdate() - timedelta(days=options["keep_intraday_days"])
+            compacted = compact_snapshots(before=cutoff)
+            ranked = refresh_leaderboard()
+            self.stdout.write(self.style.SUCCESS(
+                f"Snapshot of {valued} portfolios taken; {ranked} ranked; {compacted} intraday rows compacted"
+            ))
+
+            if options["once"]:
+                break
+            time.sleep(max(0, interval - (time.monotonic() - started)))
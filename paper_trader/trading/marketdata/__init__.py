@@ -0,0 +1,285 @@
+"""Market-data access for the trading app.
+
+Views never talk to a vendor directly: they call ``get_quote`` and
+``get_history`` here, which go through the process-wide ``quote_cache`` and
+then the provider selected by ``settings.MARKET_DATA_PROVIDER``.
+
+The ``a``-prefixed functions are the same calls for async views: the
+blocking vendor client runs on the shared, bounded thread pool (so its
+HTTP connections are reused) while the event loop awaits it with a timeout.
+
+Every vendor call goes through ``breaker``. While it is open the calls
+raise ``VendorUnavailable`` at once and callers fall back to the prices and
+bars already stored, so an outage costs nothing per page.
+"""
+
+import asyncio
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ..metrics import timed_call
+from .base import MarketDataError, MarketDataProvider, Quote
+from .breaker import CircuitBreaker, VendorUnavailable
+from .cache import QuoteCache
+
+PROVIDERS = {
+    "yfinance": "trading.marketdata.yahoo.YFinanceProvider",
+    "local": "trading.marketdata.local.LocalProvider",
+}
+
+quote_cache = QuoteCache(maxsize=settings.MARKET_DATA_CACHE_SIZE, ttl=settings.MARKET_DATA_QUOTE_TTL)
+breaker = CircuitBreaker(
+    window=settings.MARKET_DATA_BREAKER_WINDOW,
+    failure_rate=settings.MARKET_DATA_BREAKER_FAILURE_RATE,
+    min_calls=settings.MARKET_DATA_BREAKER_MIN_CALLS,
+    reset_timeout=settings.MARKET_DATA_BREAKER_RESET_TIMEOUT,
+)
+
+_provider = None
+_executor = None
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        name = settings.MARKET_DATA_PROVIDER
+        _provider = import_string(PROVIDERS.get(name, name))()
+    return _provider
+
+
+def reset():
+    """Drop the cached provider instance, every cached quote and the breaker state."""
+    global _provider
+    _provider = None
+    quote_cache.clear()
+    breaker.reset()
+
+
+def use_provider(provider):
+    """Install ``provider`` in place of the configured one, with empty caches."""
+    global _provider
+    reset()
+    _provider = provider
+
+
+def offline():
+    """True while the breaker is refusing vendor calls."""
+    return breaker.is_open
+
+
+@timed_call("market_data")
+def get_quote(symbol):
+    cached = quote_cache.get(("quote", symbol))
+    return cached if cached is not None else _fetch_quote(symbol)
+
+
+def _fetch_quote(symbol):
+    # For callers that have already looked in the cache, so the miss is counted once
+    quote = breaker.call(get_provider().get_quote, symbol, slow_after=settings.MARKET_DATA_QUOTE_TIMEOUT)
+    quote_cache.set(("quote", symbol), quote, settings.MARKET_DATA_QUOTE_TTL)
+    return quote
+
+
+@timed_call("market_data")
+def get_history(symbol, period="1mo"):
+    return quote_cache.get_or_set(
+        ("history", symbol, period, None),
+        lambda: breaker.call(
+            get_provider().get_history, symbol, period, slow_after=settings.MARKET_DATA_HISTORY_TIMEOUT
+        ),
+        settings.MARKET_DATA_HISTORY_TTL,
+    )
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.MARKET_DATA_MAX_WORKERS,
+            thread_name_prefix="marketdata",
+        )
+    return _executor
+
+
+@timed_call("market_data")
+def get_quotes(symbols, timeout=None, deadline=None):
+    """Fetch quotes for many symbols concurrently on a bounded thread pool.
+
+    Each call may run for ``timeout`` seconds once it has started and the
+    whole fan-out gives up after ``deadline`` seconds. Returns
+    ``(quotes, stale)`` where ``stale`` lists the symbols without a usable
+    price; calls that were abandoned keep running and fill the cache for
+    the next request.
+    """
+    timeout = settings.MARKET_DATA_QUOTE_TIMEOUT if timeout is None else timeout
+    deadline = settings.MARKET_DATA_FANOUT_DEADLINE if deadline is None else deadline
+    symbols = list(dict.fromkeys(symbols))
+
+    quotes = {}
+    started = {}
+    pending = {}
+
+    def fetch(symbol):
+        started[symbol] = time.monotonic()
+        return _fetch_quote(symbol)
+
+    for symbol in symbols:
+        cached = quote_cache.get(("quote", symbol))
+        if cached is not None:
+            quotes[symbol] = cached
+        elif not offline():
+            pending[_get_executor().submit(fetch, symbol)] = symbol
+
+    end = time.monotonic() + deadline
+    while pending:
+        now = time.monotonic()
+        for future, symbol in list(pending.items()):
+            if symbol in started and now - started[symbol] >= timeout:
+                del pending[future]
+        if not pending or now >= end:
+            break
+
+        done, _ = wait(pending, timeout=min(end - now, timeout), return_when=FIRST_COMPLETED)
+        for future in done:
+            symbol = pending.pop(future)
+            try:
+                quotes[symbol] = future.result()
+            except MarketDataError:
+                pass
+
+    # Calls still queued are dropped; ones already running finish in the background
+    for future in pending:
+        future.cancel()
+
+    stale = [symbol for symbol in symbols if symbol not in quotes or quotes[symbol].price is None]
+    return quotes, stale
+
+
+@timed_call("market_data")
+def get_histories(symbols, period="1mo", refresh=False, start=None):
+    """Fetch history for many symbols, batching whatever is not cached.
+
+    Misses are downloaded ``MARKET_DATA_BATCH_SIZE`` symbols at a time.
+    ``refresh=True`` skips the cache lookup but still stores the result.
+    Symbols the provider could not return are left out of the result.
+    """
+    histories = {}
+    missing = []
+    for symbol in symbols:
+        hist = None if refresh else quote_cache.get(("history", symbol, period, start))
+        if hist is None:
+            missing.append(symbol)
+        else:
+            histories[symbol] = hist
+
+    batch_size = settings.MARKET_DATA_BATCH_SIZE
+    for offset in range(0, len(missing), batch_size):
+        chunk = missing[offset:offset + batch_size]
+        try:
+            fetched = breaker.call(
+                get_provider().get_history_many, chunk, period, start,
+                slow_after=settings.MARKET_DATA_HISTORY_TIMEOUT,
+            )
+        except MarketDataError:
+            continue
+        for symbol, hist in fetched.items():
+            quote_cache.set(("history", symbol, period, start), hist, settings.MARKET_DATA_HISTORY_TTL)
+            histories[symbol] = hist
+    return histories
+
+
+async def _in_pool(func, *args, timeout=None):
+    # Carry the request's context along so its metrics see the cache lookups
+    context = contextvars.copy_context()
+    call = asyncio.get_running_loop().run_in_executor(_get_executor(), context.run, func, *args)
+    return await asyncio.wait_for(call, timeout)
+
+
+@timed_call("market_data")
+async def aget_quote(symbol, timeout=None):
+    cached = quote_cache.get(("quote", symbol))
+    if cached is not None:
+        return cached
+    if offline():
+        raise VendorUnavailable(f"Market data vendor is unavailable; no live quote for {symbol}")
+    timeout = settings.MARKET_DATA_QUOTE_TIMEOUT if timeout is None else timeout
+    try:
+        return await _in_pool(_fetch_quote, symbol, timeout=timeout)
+    except asyncio.TimeoutError as exc:
+        raise MarketDataError(f"Timed out fetching quote for {symbol}") from exc
+
+
+@timed_call("market_data")
+async def aget_quotes(symbols, timeout=None, deadline=None):
+    """Async ``get_quotes``: every symbol is awaited at once with ``asyncio.gather``."""
+    deadline = settings.MARKET_DATA_FANOUT_DEADLINE if deadline is None else deadline
+    symbols = list(dict.fromkeys(symbols))
+
+    async def fetch(symbol):
+        try:
+            return await aget_quote(symbol, timeout)
+        except MarketDataError:
+            return None
+
+    try:
+        results = await asyncio.wait_for(asyncio.gather(*(fetch(s) for s in symbols)), deadline)
+    except asyncio.TimeoutError:
+        # Keep whatever the abandoned calls have cached by now; each was already counted as a miss
+        results = [quote_cache.peek(("quote", s)) for s in symbols]
+
+    quotes = {s: q for s, q in zip(symbols, results) if q is not None}
+    stale = [s for s in symbols if s not in quotes or quotes[s].price is None]
+    return quotes, stale
+
+
+@timed_call("market_data")
+async def aget_histories(symbols, period="1mo", refresh=False, start=None, timeout=None):
+    """Async ``get_histories``: the batches are downloaded concurrently.
+
+    A batch that fails or takes longer than ``timeout`` seconds is left out,
+    like a failed batch in ``get_histories``.
+    """
+    timeout = settings.MARKET_DATA_HISTORY_TIMEOUT if timeout is None else timeout
+    symbols = list(symbols)
+    if offline():
+        # Only cache lookups and refused batches, so no need for the pool
+        return get_histories(symbols, period, refresh, start)
+    batch_size = settings.MARKET_DATA_BATCH_SIZE
+    chunks = [symbols[offset:offset + batch_size] for offset in range(0, len(symbols), batch_size)]
+
+    results = await asyncio.gather(
+        *(_in_pool(get_histories, chunk, period, refresh, start, timeout=timeout) for chunk in chunks),
+        return_exceptions=True,
+    )
+    histories = {}
+    for result in results:
+        if isinstance(result, dict):
+            histories.update(result)
+    return histories
+
+
+__all__ = [
+    "aget_histories",
+    "aget_quote",
+    "aget_quotes",
+    "breaker",
+    "CircuitBreaker",
+    "MarketDataError",
+    "MarketDataProvider",
+    "Quote",
+    "QuoteCache",
+    "get_histories",
+    "get_history",
+    "get_provider",
+    "get_quote",
+    "get_quotes",
+    "offline",
+    "quote_cache",
+    "reset",
+    "use_provider",
+    "VendorUnavailable",
+]
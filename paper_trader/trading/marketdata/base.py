@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+
+
+class MarketDataError(Exception):
+    """Raised when a provider cannot reach its upstream for a symbol."""
+
+
+@dataclass(frozen=True)
+class Quote:
+    symbol: str
+    price: float | None
+    previous_close: float | None = None
+
+
+class MarketDataProvider:
+    """Interface every market-data backend implements.
+
+    ``get_history`` returns a pandas DataFrame indexed by date with at least
+    a ``Close`` column, matching what ``yfinance`` hands back. When
+    ``start`` is given it takes precedence over ``period``.
+    """
+
+    name = None
+
+    def get_quote(self, symbol):
+        raise NotImplementedError
+
+    def get_history(self, symbol, period="1mo", start=None):
+        raise NotImplementedError
+
+    def get_history_many(self, symbols, period="1mo", start=None):
+        """Return ``{symbol: DataFrame}`` for several symbols at once.
+
+        Backends with a batch endpoint should override this; the default
+        just loops over ``get_history``.
+        """
+        return {symbol: self.get_history(symbol, period, start) for symbol in symbols}
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import deque
+
+from .base import MarketDataError
+
+
+class VendorUnavailable(MarketDataError):
+    """Raised instead of calling the vendor while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Fail fast while the vendor is down instead of waiting on every call.
+
+    The outcomes of the last ``window`` calls are kept; once at least
+    ``min_calls`` of them are recorded and the share of failures reaches
+    ``failure_rate`` the breaker opens and calls are refused. After
+    ``reset_timeout`` seconds it lets a single trial call through
+    (half-open): success closes it again, failure re-opens it. A call that
+    succeeds but takes longer than its ``slow_after`` counts as a failure,
+    so a vendor that only hangs trips the breaker too.
+
+    State is per process, like ``QuoteCache``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window=20, failure_rate=0.5, min_calls=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._outcomes = deque(maxlen=window)  # True for success
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._cooled_down():
+                return self.HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self):
+        """True while calls are being refused outright."""
+        return self.state == self.OPEN
+
+    def _cooled_down(self):
+        return self.clock() - self._opened_at >= self.reset_timeout
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = self.clock()
+        self._trial_running = False
+        self._outcomes.clear()
+
+    def allow(self):
+        """Whether a call may go to the vendor now; claims the trial slot when half-open."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if not self._cooled_down():
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                self._outcomes.append(True)
+            elif self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._trial_running = False
+                self._outcomes.clear()
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+            elif self._state == self.CLOSED:
+                self._outcomes.append(False)
+                failures = self._outcomes.count(False)
+                if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._opened_at = None
+            self._trial_running = False
+            self._outcomes.clear()
+
+    def call(self, func, *args, slow_after=None):
+        """Run ``func(*args)`` through the breaker.
+
+        Raises ``VendorUnavailable`` without calling ``func`` while open.
+        Only ``MarketDataError`` counts as a vendor failure; anything else
+        is a bug and propagates untouched.
+        """
+        if not self.allow():
+            raise VendorUnavailable("Market data vendor is unavailable; using last known prices")
+        started = self.clock()
+        try:
+            result = func(*args)
+        except MarketDataError:
+            self.record_failure()
+            raise
+        except BaseException:
+            with self._lock:
+                self._trial_running = False  # don't leave the half-open slot claimed forever
+            raise
+        if slow_after is not None and self.clock() - started > slow_after:
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
@@ -0,0 +1,94 @@
+import time
+import zlib
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .base import MarketDataProvider, Quote
+
+PERIOD_DAYS = {
+    "1mo": 30,
+    "3mo": 91,
+    "6mo": 182,
+    "1y": 365,
+    "2y": 730,
+    "5y": 1826,
+    "10y": 3652,
+}
+
+
+def _business_days(period, end, start=None):
+    if start is not None:
+        return pd.bdate_range(start=start, end=end)
+    if period.endswith("d") and period[:-1].isdigit():
+        return pd.bdate_range(end=end, periods=int(period[:-1]))
+    return pd.bdate_range(start=end - timedelta(days=PERIOD_DAYS.get(period, 30)), end=end)
+
+
+class LocalProvider(MarketDataProvider):
+    """Deterministic offline prices derived from the symbol and the date.
+
+    The same symbol always produces the same series, so pages, tests and
+    benchmarks behave identically without network access.
+    """
+
+    name = "local"
+
+    def _closes(self, symbol, index):
+        seed = zlib.crc32(symbol.encode())
+        base = 20 + seed % 480
+        phase = (seed >> 8) % 360
+        days = np.asarray([d.toordinal() for d in index.date], dtype=float)
+        wave = 0.10 * np.sin(days / 23 + phase) + 0.03 * np.sin(days / 4 + phase / 7)
+        return np.round(base * (1 + wave), 2)
+
+    def get_history(self, symbol, period="1mo", start=None):
+        index = _business_days(period, pd.Timestamp(date.today()), start)
+        close = self._closes(symbol, index)
+        open_ = self._closes(symbol, index - pd.offsets.BDay(1))
+        seed = zlib.crc32(symbol.encode())
+        return pd.DataFrame(
+            {
+                "Open": open_,
+                "High": np.round(np.maximum(open_, close) * 1.005, 2),
+                "Low": np.round(np.minimum(open_, close) * 0.995, 2),
+                "Close": close,
+                "Volume": (seed % 9000 + 1000) * 100,
+            },
+            index=index,
+        )
+
+    def get_quote(self, symbol):
+        hist = self.get_history(symbol, period="5d")
+        return Quote(
+            symbol=symbol,
+            price=float(hist["Close"].iloc[-1]),
+            previous_close=float(hist["Close"].iloc[-2]),
+        )
+
+
+class DelayedProvider(MarketDataProvider):
+    """Another provider behind a fixed delay per upstream call.
+
+    Stands in for a slow vendor in ``manage.py benchmark``: a batched
+    history download costs one delay, like one ``yf.download`` request.
+    """
+
+    name = "delayed"
+
+    def __init__(self, provider=None, latency=0.05):
+        self.provider = provider or LocalProvider()
+        self.latency = latency
+
+    def get_quote(self, symbol):
+        time.sleep(self.latency)
+        return self.provider.get_quote(symbol)
+
+    def get_history(self, symbol, period="1mo", start=None):
+        time.sleep(self.latency)
+        return self.provider.get_history(symbol, period, start)
+
+    def get_history_many(self, symbols, period="1mo", start=None):
+        time.sleep(self.latency)
+        return {symbol: self.provider.get_history(symbol, period, start) for symbol in symbols}
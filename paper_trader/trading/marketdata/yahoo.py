@@ -0,0 +1,67 @@
+import pandas as pd
+import yfinance as yf
+from curl_cffi.requests.errors import CurlError
+from requests.exceptions import RequestException
+from yfinance.exceptions import YFRateLimitError
+
+from .base import MarketDataError, MarketDataProvider, Quote
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def get_quote(self, symbol):
+        try:
+            info = yf.Ticker(symbol).info
+        except (CurlError, RequestException, YFRateLimitError) as exc:
+            raise MarketDataError(f"Unable to fetch quote for {symbol}") from exc
+
+        return Quote(
+            symbol=symbol,
+            price=info.get("regularMarketPrice"),
+            previous_close=info.get("previousClose"),
+        )
+
+    def get_history(self, symbol, period="1mo", start=None):
+        try:
+            if start is not None:
+                return yf.Ticker(symbol).history(start=start)
+            return yf.Ticker(symbol).history(period=period)
+        except (CurlError, RequestException, YFRateLimitError) as exc:
+            raise MarketDataError(f"Unable to fetch history for {symbol}") from exc
+
+    def get_history_many(self, symbols, period="1mo", start=None):
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        if len(symbols) == 1:
+            hist = self.get_history(symbols[0], period, start)
+            return {symbols[0]: hist} if not hist.empty else {}
+        try:
+            data = yf.download(
+                symbols,
+                period=None if start is not None else period,
+                start=start,
+                group_by="ticker",
+                auto_adjust=True,
+                progress=False,
+                threads=True,
+            )
+        except (CurlError, RequestException, YFRateLimitError) as exc:
+            raise MarketDataError(f"Unable to fetch history for {len(symbols)} symbols") from exc
+
+        histories = {}
+        if data is None or data.empty:
+            return histories
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                frame = data[symbol]
+            else:
+                frame = data
+            # download() aligns every symbol on one date index, so drop the gaps
+            frame = frame.dropna(subset=["Close"])
+            if not frame.empty:
+                histories[symbol] = frame
+        return histories
@@ -0,0 +1,140 @@
+"""Matching of resting limit and stop orders against price ticks.
+
+Open orders are held in memory in two heaps per symbol, keyed by trigger
+price: one for orders that fire when the price falls to the trigger (buy
+limits, sell stops) and one for orders that fire when it rises to it (sell
+limits, buy stops). A tick only pops the orders it actually triggers, so its
+cost is O(k log n) for k fills among n open orders rather than a table scan.
+
+Orders that stop being open elsewhere (cancelled, or a portfolio reset)
+are not dug out of the heaps. They are forgotten by id and skipped when
+they surface.
+"""
+
+import heapq
+from collections import defaultdict
+from itertools import count
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, Portfolio, Transaction
+from .orders import OrderService
+
+LOAD_CHUNK = 500  # orders fetched per query, well under SQLite's parameter limit
+
+
+class OrderBook:
+    """The open orders of one symbol."""
+
+    def __init__(self):
+        self.falling = []  # (-trigger, seq, order): max-heap on trigger
+        self.rising = []   # (trigger, seq, order): min-heap on trigger
+        self.live = 0  # entries in the heaps that are still open
+
+    def __len__(self):
+        return self.live
+
+
+class MatchingEngine:
+    def __init__(self):
+        self.books = defaultdict(OrderBook)
+        self.orders = {}  # id -> symbol of every open order in the books
+        self.triggered = set()  # ids handed out by on_price, not yet seen closed
+        self._seq = count()  # keeps equal triggers in arrival order
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, order):
+        book = self.books[order.instrument.symbol]
+        if order.triggers_on_fall:
+            heapq.heappush(book.falling, (-order.trigger_price, next(self._seq), order))
+        else:
+            heapq.heappush(book.rising, (order.trigger_price, next(self._seq), order))
+        book.live += 1
+        self.orders[order.pk] = order.instrument.symbol
+
+    def drop(self, order_id):
+        """Forget an order that is no longer open; its heap entry is skipped later."""
+        symbol = self.orders.pop(order_id, None)
+        if symbol is None:
+            return
+        book = self.books[symbol]
+        book.live -= 1
+        if not book.live:
+            del self.books[symbol]  # nothing left but skipped entries
+
+    def load(self):
+        """Bring the books in line with the open orders; returns how many were added.
+
+        The open ids are compared with the ones held, rather than loading
+        ids above a high-water mark. On MySQL an order can commit after one
+        with a higher id, and a watermark would skip it for good. Orders
+        closed since the last call are dropped. Orders ``on_price`` handed
+        out are not loaded again while they're still open, because their
+        fill is under way.
+        """
+        open_ids = set(Order.objects.filter(status=Order.OPEN).values_list("pk", flat=True))
+        for order_id in self.orders.keys() - open_ids:
+            self.drop(order_id)
+        self.triggered &= open_ids
+
+        new_ids = sorted(open_ids - self.orders.keys() - self.triggered)
+        added = 0
+        for start in range(0, len(new_ids), LOAD_CHUNK):
+            new = (
+                Order.objects.filter(pk__in=new_ids[start:start + LOAD_CHUNK], status=Order.OPEN)
+                .select_related("instrument")
+                .order_by("pk")
+            )
+            for order in new:
+                self.add(order)
+                added += 1
+        return added
+
+    def symbols(self):
+        return [symbol for symbol, book in self.books.items() if book]
+
+    def on_price(self, symbol, price):
+        """Remove and return every open order on ``symbol`` that ``price`` triggers."""
+        book = self.books.get(symbol)
+        if not book:
+            return []
+
+        popped = []
+        while book.falling and price <= -book.falling[0][0]:
+            popped.append(heapq.heappop(book.falling)[2])
+        while book.rising and price >= book.rising[0][0]:
+            popped.append(heapq.heappop(book.rising)[2])
+
+        triggered = [order for order in popped if order.pk in self.orders]
+        for order in triggered:
+            self.drop(order.pk)
+            self.triggered.add(order.pk)
+        return triggered
+
+
+def fill_order(order, price):
+    """Execute a triggered order at ``price`` as a market order.
+
+    Returns the order with its final status, or ``None`` if it was cancelled
+    (or filled by another worker) after the engine loaded it.
+    """
+    with transaction.atomic():
+        # Portfolio before order, the same lock order as OrderService.reset
+        portfolio = Portfolio.objects.select_for_update().get(pk=order.portfolio_id)
+        order = Order.objects.select_for_update().select_related("instrument").get(pk=order.pk)
+        if order.status != Order.OPEN:
+            return None
+
+        service = OrderService(portfolio)
+        execute = service.buy if order.side == Transaction.BUY else service.sell
+        result = execute(order.instrument, order.quantity, price)
+
+        order.status = Order.FILLED if result.success else Order.REJECTED
+        order.fill_price = price if result.success else None
+        order.message = result.message[:200]
+        order.closed_at = timezone.now()
+        order.save(update_fields=["status", "fill_price", "message", "closed_at"])
+    return order
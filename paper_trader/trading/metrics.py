@@ -0,0 +1,217 @@
+"""Where request time goes: database, market data and the quote cache.
+
+``RequestMetricsMiddleware`` starts a ``RequestStats`` for every request
+and keeps it in a context variable, which Django carries into
+``sync_to_async`` threads. The query wrapper, the market-data functions and
+``QuoteCache`` add to it through ``timed`` and ``record_cache``. Work done
+outside a request (management commands, pool threads) is not counted.
+
+When the request finishes its numbers go into the per-view histograms in
+``registry``, served in Prometheus text format by the ``metrics`` view.
+They are per process; with several workers, scrape each one.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+
+_current = ContextVar("request_stats", default=None)
+_timing = ContextVar("metrics_timing", default=frozenset())  # kinds being timed in this task
+_lock = threading.Lock()  # async views update one request's stats from several pool threads
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    db_queries: int = 0
+    db_time: float = 0.0
+    market_data_calls: int = 0
+    market_data_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def cache_hit_ratio(self):
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+
+def start():
+    """Begin counting for the current request; returns the token for ``stop``."""
+    return _current.set(RequestStats())
+
+
+def stop(token):
+    stats = _current.get()
+    _current.reset(token)
+    return stats
+
+
+@contextmanager
+def timed(kind):
+    """Count one ``"db"`` or ``"market_data"`` call and its time.
+
+    Calls made while one of the same kind is already being timed (say
+    ``aget_quotes`` fanning out to ``aget_quote``) are part of it and are
+    not counted again.
+    """
+    stats = _current.get()
+    outer = _timing.get()
+    if stats is None or kind in outer:
+        yield
+        return
+
+    token = _timing.set(outer | {kind})
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _timing.reset(token)
+        with _lock:
+            if kind == "db":
+                stats.db_queries += 1
+                stats.db_time += elapsed
+            else:
+                stats.market_data_calls += 1
+                stats.market_data_time += elapsed
+
+
+def timed_call(kind):
+    """Decorator form of ``timed`` for sync and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with timed(kind):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with timed(kind):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache(hit):
+    stats = _current.get()
+    if stats is None:
+        return
+    with _lock:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def query_timer(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook that times every query."""
+    with timed("db"):
+        return execute(sql, params, many, context)
+
+
+def server_timing(stats, elapsed):
+    """A ``Server-Timing`` header value, shown per request in browser dev tools."""
+    parts = [
+        f"total;dur={elapsed * 1000:.1f}",
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries"',
+        f'marketdata;dur={stats.market_data_time * 1000:.1f};desc="{stats.market_data_calls} calls"',
+    ]
+    if stats.cache_hit_ratio is not None:
+        parts.append(f'cache;desc="{stats.cache_hits}/{stats.cache_hits + stats.cache_misses} hits"')
+    return ", ".join(parts)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Per-view histograms and counters, rendered in Prometheus text format."""
+
+    HISTOGRAMS = {
+        "request_duration_seconds": "Wall time of each request.",
+        "db_duration_seconds": "Time spent in database queries per request.",
+        "market_data_duration_seconds": "Time spent waiting on market data per request.",
+    }
+    COUNTERS = {
+        "requests_total": "Requests served.",
+        "db_queries_total": "Database queries run.",
+        "market_data_calls_total": "Market-data calls made.",
+        "cache_hits_total": "Quote cache hits.",
+        "cache_misses_total": "Quote cache misses.",
+    }
+    PREFIX = "paper_trader_"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.histograms = {name: {} for name in self.HISTOGRAMS}
+        self.counters = {name: {} for name in self.COUNTERS}
+
+    def observe(self, view, stats, elapsed):
+        samples = {
+            "request_duration_seconds": elapsed,
+            "db_duration_seconds": stats.db_time,
+            "market_data_duration_seconds": stats.market_data_time,
+        }
+        increments = {
+            "requests_total": 1,
+            "db_queries_total": stats.db_queries,
+            "market_data_calls_total": stats.market_data_calls,
+            "cache_hits_total": stats.cache_hits,
+            "cache_misses_total": stats.cache_misses,
+        }
+        with self._lock:
+            for name, value in samples.items():
+                self.histograms[name].setdefault(view, Histogram()).observe(value)
+            for name, value in increments.items():
+                self.counters[name][view] = self.counters[name].get(view, 0) + value
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, help_text in self.HISTOGRAMS.items():
+                metric = self.PREFIX + name
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for view, histogram in sorted(self.histograms[name].items()):
+                    label = f'view="{_escape(view)}"'
+                    cumulative = 0
+                    for bound, count in zip((*BUCKETS, "+Inf"), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                    lines.append(f"{metric}_sum{{{label}}} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{{{label}}} {cumulative}")
+            for name, help_text in self.COUNTERS.items():
+                metric = self.PREFIX + name
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for view, value in sorted(self.counters[name].items()):
+                    lines.append(f'{metric}{{view="{_escape(view)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
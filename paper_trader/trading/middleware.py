@@ -0,0 +1,63 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+logger = logging.getLogger("trading.metrics")
+
+
+class RequestMetricsMiddleware:
+    """Time each request and report it as ``Server-Timing``, a log line and metrics.
+
+    Put it first in ``MIDDLEWARE`` so the session and user queries count too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = metrics.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = metrics.stop(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        token = metrics.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stats = metrics.stop(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        elapsed = stats.elapsed
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+
+        metrics.registry.observe(view, stats, elapsed)
+        response["Server-Timing"] = metrics.server_timing(stats, elapsed)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "view": view,
+                "method": request.method,
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 1),
+                "db_queries": stats.db_queries,
+                "db_ms": round(stats.db_time * 1000, 1),
+                "market_data_calls": stats.market_data_calls,
+                "market_data_ms": round(stats.market_data_time * 1000, 1),
+                "cache_hit_ratio": stats.cache_hit_ratio,
+            }))
+        return response
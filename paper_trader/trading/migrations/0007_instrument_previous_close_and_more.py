@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0006_portfoliosnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instrument',
+            name='previous_close',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='instrument',
+            name='price_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
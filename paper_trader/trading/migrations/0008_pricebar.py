@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0007_instrument_previous_close_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('open', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('volume', models.BigIntegerField(default=0)),
+                ('instrument', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bars', to='trading.instrument')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('instrument', 'date'), name='unique_bar_per_instrument_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0008_pricebar'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['portfolio', 'timestamp'], name='transaction_portfolio_time'),
+        ),
+    ]
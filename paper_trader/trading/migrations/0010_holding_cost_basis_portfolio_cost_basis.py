@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0009_transaction_transaction_portfolio_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='holding',
+            name='average_cost',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='holding',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='holding',
+            name='realized_pnl',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='portfolio',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='portfolio',
+            name='realized_pnl',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:40
+
+import datetime
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def bucket_existing_snapshots(apps, schema_editor):
+    """Keep the latest snapshot per portfolio and day, stamped at midnight."""
+    PortfolioSnapshot = apps.get_model('trading', 'PortfolioSnapshot')
+    seen = set()
+    duplicates = []
+    for snap in PortfolioSnapshot.objects.order_by('portfolio_id', 'date', '-id').iterator():
+        key = (snap.portfolio_id, snap.date)
+        if key in seen:
+            duplicates.append(snap.pk)
+            continue
+        seen.add(key)
+        snap.timestamp = datetime.datetime.combine(snap.date, datetime.time.min, tzinfo=datetime.timezone.utc)
+        snap.save(update_fields=['timestamp'])
+    PortfolioSnapshot.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0010_holding_cost_basis_portfolio_cost_basis'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portfoliosnapshot',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='granularity',
+            field=models.CharField(choices=[('INTRADAY', 'Intraday'), ('DAILY', 'Daily')], default='DAILY', max_length=8),
+        ),
+        migrations.RunPython(bucket_existing_snapshots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='portfoliosnapshot',
+            constraint=models.UniqueConstraint(fields=('portfolio', 'timestamp'), name='unique_snapshot_per_bucket'),
+        ),
+        migrations.AddIndex(
+            model_name='portfoliosnapshot',
+            index=models.Index(fields=['portfolio', 'date'], name='snapshot_portfolio_date'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_default_portfolio(apps, schema_editor):
+    """Hand the single pre-multi-user portfolio to the first superuser, if any."""
+    Portfolio = apps.get_model('trading', 'Portfolio')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    owner = User.objects.filter(is_superuser=True).order_by('pk').first()
+    portfolio = Portfolio.objects.filter(user__isnull=True).order_by('pk').first()
+    if owner is not None and portfolio is not None:
+        portfolio.user = owner
+        portfolio.save(update_fields=['user'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0011_portfoliosnapshot_buckets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='portfolio', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='holding',
+            index=models.Index(fields=['portfolio', 'instrument'], name='holding_portfolio_instrument'),
+        ),
+        migrations.RunPython(assign_default_portfolio, migrations.RunPython.noop),
+    ]
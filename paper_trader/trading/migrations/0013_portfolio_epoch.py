@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0012_portfolio_user_holding_portfolio_instrument'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portfolio',
+            name='reset_timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='portfolio',
+            name='epoch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='epoch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='epoch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['portfolio', 'epoch', 'timestamp'], name='transaction_portfolio_epoch'),
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='transaction_portfolio_time',
+        ),
+        migrations.RemoveConstraint(
+            model_name='portfoliosnapshot',
+            name='unique_snapshot_per_bucket',
+        ),
+        migrations.AddConstraint(
+            model_name='portfoliosnapshot',
+            constraint=models.UniqueConstraint(fields=('portfolio', 'epoch', 'timestamp'), name='unique_snapshot_per_bucket'),
+        ),
+    ]
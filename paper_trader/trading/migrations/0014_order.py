@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0013_portfolio_epoch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('side', models.CharField(choices=[('BUY', 'Buy'), ('SELL', 'Sell')], max_length=4)),
+                ('kind', models.CharField(choices=[('LIMIT', 'Limit'), ('STOP', 'Stop')], max_length=5)),
+                ('quantity', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('trigger_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('FILLED', 'Filled'), ('CANCELLED', 'Cancelled'), ('REJECTED', 'Rejected')], default='OPEN', max_length=9)),
+                ('fill_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('message', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('instrument', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='trading.instrument')),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='trading.portfolio')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='order_status_id'), models.Index(fields=['portfolio', 'status'], name='order_portfolio_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0014_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BacktestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('symbols', models.TextField()),
+                ('start', models.DateField()),
+                ('end', models.DateField()),
+                ('parameters', models.JSONField(default=dict)),
+                ('starting_cash', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('final_value', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('metrics', models.JSONField(default=dict)),
+                ('equity', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BacktestTrade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('symbol', models.CharField(max_length=10)),
+                ('side', models.CharField(choices=[('BUY', 'Buy'), ('SELL', 'Sell')], max_length=4)),
+                ('quantity', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('price', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trades', to='trading.backtestrun')),
+            ],
+        ),
+    ]
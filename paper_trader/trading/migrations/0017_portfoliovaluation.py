@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0016_alter_transaction_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioValuation',
+            fields=[
+                ('portfolio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='valuation', serialize=False, to='trading.portfolio')),
+                ('rank', models.PositiveIntegerField()),
+                ('cash_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('holdings_value', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('total_value', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('return_percent', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rank'], name='valuation_rank')],
+            },
+        ),
+    ]
@@ -1,17 +1,47 @@
+from datetime import date
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class Instrument(models.Model):
     name = models.CharField(max_length=100)
     symbol = models.CharField(max_length=10, unique=True)
     current_price = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_close = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_updated_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.name} ({self.symbol})"
 
 
+class PriceBar(models.Model):
+    instrument = models.ForeignKey(Instrument, on_delete=models.CASCADE, related_name="bars")
+    date = models.DateField()
+    open = models.DecimalField(max_digits=12, decimal_places=4)
+    high = models.DecimalField(max_digits=12, decimal_places=4)
+    low = models.DecimalField(max_digits=12, decimal_places=4)
+    close = models.DecimalField(max_digits=12, decimal_places=4)
+    volume = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["instrument", "date"], name="unique_bar_per_instrument_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.instrument.symbol} {self.date} close {self.close}"
+
+
 class Portfolio(models.Model):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name="portfolio"
+    )
     cash_balance = models.DecimalField(max_digits=12, decimal_places=2, default=10000)  # start with $10,000
-    reset_timestamp = models.DateTimeField(auto_now=True)
+    reset_timestamp = models.DateTimeField(default=timezone.now)
+    epoch = models.PositiveIntegerField(default=0)  # bumped on reset; older rows await purge_epochs
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # cost basis of open positions
+    realized_pnl = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     def __str__(self):
         return f"Portfolio - Cash: ${self.cash_balance}"
 
@@ -20,6 +50,14 @@ class Holding(models.Model):
     portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name="holdings")
     instrument = models.ForeignKey(Instrument, on_delete=models.CASCADE)
     quantity = models.DecimalField(max_digits=12, decimal_places=4)
+    average_cost = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    realized_pnl = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["portfolio", "instrument"], name="holding_portfolio_instrument"),
+        ]
 
     def __str__(self):
         return f"{self.instrument.symbol} - {self.quantity} shares"
@@ -35,18 +73,132 @@ class Transaction(models.Model):
     type = models.CharField(max_length=4, choices=TYPE_CHOICES)
     quantity = models.DecimalField(max_digits=12, decimal_places=4)
     price = models.DecimalField(max_digits=12, decimal_places=2)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # not auto_now_add, so imports keep theirs
+    epoch = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["portfolio", "epoch", "timestamp"], name="transaction_portfolio_epoch"),
+        ]
 
     @property
     def total_value(self):
         return self.price * self.quantity
     def __str__(self):
         return f"{self.type} {self.quantity} {self.instrument.symbol} @ {self.price}"
+
+
+class Order(models.Model):
+    """A resting limit or stop order, filled by ``manage.py match_orders``."""
+    LIMIT = 'LIMIT'
+    STOP = 'STOP'
+    KIND_CHOICES = [(LIMIT, 'Limit'), (STOP, 'Stop')]
+
+    OPEN = 'OPEN'
+    FILLED = 'FILLED'
+    CANCELLED = 'CANCELLED'
+    REJECTED = 'REJECTED'
+    STATUS_CHOICES = [(OPEN, 'Open'), (FILLED, 'Filled'), (CANCELLED, 'Cancelled'), (REJECTED, 'Rejected')]
+
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name="orders")
+    instrument = models.ForeignKey(Instrument, on_delete=models.CASCADE)
+    side = models.CharField(max_length=4, choices=Transaction.TYPE_CHOICES)
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    quantity = models.DecimalField(max_digits=12, decimal_places=4)
+    trigger_price = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=9, choices=STATUS_CHOICES, default=OPEN)
+    fill_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    message = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="order_status_id"),
+            models.Index(fields=["portfolio", "status"], name="order_portfolio_status"),
+        ]
+
+    @property
+    def triggers_on_fall(self):
+        """Buy limits and sell stops fire when the price drops to the trigger."""
+        return (self.side == Transaction.BUY) == (self.kind == self.LIMIT)
+
+    def __str__(self):
+        return f"{self.kind} {self.side} {self.quantity} {self.instrument.symbol} @ {self.trigger_price} ({self.status})"
     
 class PortfolioSnapshot(models.Model):
+    INTRADAY = 'INTRADAY'
+    DAILY = 'DAILY'
+    GRANULARITY_CHOICES = [(INTRADAY, 'Intraday'), (DAILY, 'Daily')]
+
     portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE)
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=date.today)
+    timestamp = models.DateTimeField(default=timezone.now)  # start of the snapshot bucket
+    granularity = models.CharField(max_length=8, choices=GRANULARITY_CHOICES, default=DAILY)
     total_value = models.DecimalField(max_digits=12, decimal_places=2)
+    epoch = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["portfolio", "epoch", "timestamp"], name="unique_snapshot_per_bucket"),
+        ]
+        indexes = [
+            models.Index(fields=["portfolio", "date"], name="snapshot_portfolio_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - ${self.total_value}"
+
+
+class PortfolioValuation(models.Model):
+    """A portfolio's place on the leaderboard, rewritten by ``take_snapshots``."""
+    portfolio = models.OneToOneField(
+        Portfolio, on_delete=models.CASCADE, primary_key=True, related_name="valuation"
+    )
+    rank = models.PositiveIntegerField()
+    cash_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    holdings_value = models.DecimalField(max_digits=16, decimal_places=2)
+    total_value = models.DecimalField(max_digits=16, decimal_places=2)
+    return_percent = models.DecimalField(max_digits=12, decimal_places=2)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["rank"], name="valuation_rank"),
+        ]
+
+    @property
+    def username(self):
+        user = self.portfolio.user
+        return user.username if user else f"Portfolio {self.portfolio_id}"
+
+    def __str__(self):
+        return f"#{self.rank} - ${self.total_value}"
+
+
+class BacktestRun(models.Model):
+    """A saved result of ``manage.py backtest --save``."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    symbols = models.TextField()  # comma-separated universe
+    start = models.DateField()
+    end = models.DateField()
+    parameters = models.JSONField(default=dict)
+    starting_cash = models.DecimalField(max_digits=14, decimal_places=2)
+    final_value = models.DecimalField(max_digits=14, decimal_places=2)
+    metrics = models.JSONField(default=dict)
+    equity = models.JSONField(default=dict)  # {"dates": [...], "values": [...]}
+
+    def __str__(self):
+        return f"Backtest {self.pk} {self.start}–{self.end}: ${self.final_value}"
+
+
+class BacktestTrade(models.Model):
+    run = models.ForeignKey(BacktestRun, on_delete=models.CASCADE, related_name="trades")
+    date = models.DateField()
+    symbol = models.CharField(max_length=10)
+    side = models.CharField(max_length=4, choices=Transaction.TYPE_CHOICES)
+    quantity = models.DecimalField(max_digits=12, decimal_places=4)
+    price = models.DecimalField(max_digits=12, decimal_places=4)
 
     def __str__(self):
-        return f"{self.date} - ${self.total_value}"
\ No newline at end of file
+        return f"{self.date} {self.side} {self.quantity} {self.symbol} @ {self.price}"
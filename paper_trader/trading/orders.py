@@ -0,0 +1,268 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .ledger import apply_buy, apply_sell
+from .models import Holding, Instrument, Order, Portfolio, Transaction
+
+LEDGER_FIELDS = ["quantity", "average_cost", "total_cost", "realized_pnl"]
+PORTFOLIO_FIELDS = ["cash_balance", "total_cost", "realized_pnl"]
+STARTING_CASH = Decimal("10000.00")
+
+
+@dataclass(frozen=True)
+class OrderResult:
+    success: bool
+    message: str
+    transaction: Transaction | None = None
+
+
+@dataclass(frozen=True)
+class BasketOrder:
+    symbol: str
+    side: str
+    quantity: Decimal
+
+
+@dataclass(frozen=True)
+class BasketResult:
+    success: bool
+    errors: list
+    transactions: list
+
+
+class OrderService:
+    """Executes market orders for one portfolio.
+
+    Every order runs in a single database transaction that locks the
+    portfolio row first and the holding row second, so concurrent orders
+    against the same portfolio (from several workers) are applied one at a
+    time and can never overdraw cash or oversell a position.
+    """
+
+    def __init__(self, portfolio):
+        self.portfolio = portfolio
+
+    def _locked_portfolio(self):
+        return Portfolio.objects.select_for_update().get(pk=self.portfolio.pk)
+
+    def _sync(self, portfolio):
+        for field in PORTFOLIO_FIELDS:
+            setattr(self.portfolio, field, getattr(portfolio, field))
+
+    def reset(self, cash=STARTING_CASH):
+        """Start this portfolio over with ``cash`` and no positions.
+
+        Past transactions and snapshots are not deleted here: bumping the
+        portfolio's epoch hides them from every view, and ``purge_epochs``
+        removes them later in batches. Only the handful of holding rows is
+        deleted and open orders are cancelled, so resetting costs the same
+        however long the history is.
+        """
+        with transaction.atomic():
+            portfolio = self._locked_portfolio()
+            Holding.objects.filter(portfolio=portfolio).delete()
+            Order.objects.filter(portfolio=portfolio, status=Order.OPEN).update(
+                status=Order.CANCELLED, message="Cancelled by portfolio reset.", closed_at=timezone.now()
+            )
+
+            portfolio.epoch += 1
+            portfolio.reset_timestamp = timezone.now()
+            portfolio.cash_balance = cash
+            portfolio.total_cost = 0
+            portfolio.realized_pnl = 0
+            portfolio.save(update_fields=PORTFOLIO_FIELDS + ["epoch", "reset_timestamp"])
+
+        self._sync(portfolio)
+        self.portfolio.epoch = portfolio.epoch
+
+    def buy(self, instrument, quantity, price):
+        quantity = Decimal(str(quantity))
+        price = Decimal(str(price))
+        if quantity <= 0:
+            return OrderResult(False, "Invalid quantity entered.")
+        total_cost = quantity * price
+
+        with transaction.atomic():
+            portfolio = self._locked_portfolio()
+            if portfolio.cash_balance < total_cost:
+                return OrderResult(False, "Insufficient cash to complete purchase.")
+
+            holding = (
+                Holding.objects.select_for_update()
+                .filter(portfolio=portfolio, instrument=instrument)
+                .first()
+            )
+            if holding is None:
+                holding = Holding(portfolio=portfolio, instrument=instrument, quantity=0)
+
+            portfolio.cash_balance -= total_cost
+            portfolio.total_cost += apply_buy(holding, quantity, price)
+            portfolio.save(update_fields=PORTFOLIO_FIELDS)
+
+            if holding.pk is None:
+                holding.save()
+            else:
+                holding.save(update_fields=LEDGER_FIELDS)
+
+            tx = Transaction.objects.create(
+                instrument=instrument,
+                portfolio=portfolio,
+                type=Transaction.BUY,
+                quantity=quantity,
+                price=price,
+                epoch=portfolio.epoch,
+            )
+
+        self._sync(portfolio)
+        return OrderResult(
+            True,
+            f"Bought {quantity} shares of {instrument.symbol} at ${price:.2f} each (Total: ${total_cost:.2f})",
+            tx,
+        )
+
+    def sell(self, instrument, quantity, price):
+        quantity = Decimal(str(quantity))
+        price = Decimal(str(price))
+        if quantity <= 0:
+            return OrderResult(False, "Invalid quantity entered.")
+
+        with transaction.atomic():
+            portfolio = self._locked_portfolio()
+            holding = (
+                Holding.objects.select_for_update()
+                .filter(portfolio=portfolio, instrument=instrument)
+                .first()
+            )
+            if holding is None:
+                return OrderResult(False, f"You don’t own any shares of {instrument.symbol}.")
+            if quantity > holding.quantity:
+                return OrderResult(False, "You don’t own that many shares")
+
+            realized, cost = apply_sell(holding, quantity, price)
+            portfolio.cash_balance += price * quantity
+            portfolio.total_cost -= cost
+            portfolio.realized_pnl += realized
+            portfolio.save(update_fields=PORTFOLIO_FIELDS)
+
+            if holding.quantity == 0:
+                holding.delete()
+            else:
+                holding.save(update_fields=LEDGER_FIELDS)
+
+            tx = Transaction.objects.create(
+                instrument=instrument,
+                portfolio=portfolio,
+                type=Transaction.SELL,
+                quantity=quantity,
+                price=price,
+                epoch=portfolio.epoch,
+            )
+
+        self._sync(portfolio)
+        return OrderResult(
+            True,
+            f"Successfully sold {quantity} shares of {instrument.symbol} at ${price:.2f}",
+            tx,
+        )
+
+    def submit_basket(self, orders, prices):
+        """Validate and execute a list of ``BasketOrder`` all-or-nothing.
+
+        ``prices`` maps symbol to fill price. Sells are applied before buys
+        so their proceeds can fund the buys. Nothing is written unless every
+        order in the basket is valid, and the writes take a fixed number of
+        queries however many orders there are.
+        """
+        errors = []
+        if not orders:
+            errors.append("The basket is empty.")
+        for order in orders:
+            if order.side not in (Transaction.BUY, Transaction.SELL):
+                errors.append(f"{order.symbol}: side must be BUY or SELL.")
+            if order.quantity <= 0:
+                errors.append(f"{order.symbol}: invalid quantity.")
+            if order.symbol not in prices:
+                errors.append(f"{order.symbol}: no price available.")
+        if errors:
+            return BasketResult(False, errors, [])
+
+        with transaction.atomic():
+            portfolio = self._locked_portfolio()
+            instruments = Instrument.objects.in_bulk({o.symbol for o in orders}, field_name="symbol")
+            holdings = {
+                h.instrument_id: h
+                for h in Holding.objects.select_for_update().filter(
+                    portfolio=portfolio, instrument__in=instruments.values()
+                )
+            }
+
+            positions = dict(holdings)
+            touched = set()
+            transactions = []
+
+            for order in sorted(orders, key=lambda o: o.side != Transaction.SELL):
+                instrument = instruments.get(order.symbol)
+                if instrument is None:
+                    errors.append(f"{order.symbol}: unknown instrument.")
+                    continue
+
+                price = prices[order.symbol]
+                holding = positions.get(instrument.id)
+                if order.side == Transaction.SELL:
+                    if holding is None or order.quantity > holding.quantity:
+                        errors.append(f"{order.symbol}: you don’t own that many shares.")
+                        continue
+                    realized, cost = apply_sell(holding, order.quantity, price)
+                    portfolio.cash_balance += price * order.quantity
+                    portfolio.total_cost -= cost
+                    portfolio.realized_pnl += realized
+                else:
+                    if price * order.quantity > portfolio.cash_balance:
+                        errors.append(f"{order.symbol}: insufficient cash.")
+                        continue
+                    if holding is None:
+                        holding = positions[instrument.id] = Holding(
+                            portfolio=portfolio, instrument=instrument, quantity=0
+                        )
+                    portfolio.cash_balance -= price * order.quantity
+                    portfolio.total_cost += apply_buy(holding, order.quantity, price)
+                touched.add(instrument.id)
+
+                transactions.append(Transaction(
+                    instrument=instrument,
+                    portfolio=portfolio,
+                    type=order.side,
+                    quantity=order.quantity,
+                    price=price,
+                    epoch=portfolio.epoch,
+                ))
+
+            if errors:
+                return BasketResult(False, errors, [])
+
+            changed, created, emptied = [], [], []
+            for inst_id in touched:
+                holding = positions[inst_id]
+                if holding.pk is None:
+                    if holding.quantity > 0:
+                        created.append(holding)
+                elif holding.quantity == 0:
+                    emptied.append(holding.pk)
+                else:
+                    changed.append(holding)
+
+            Transaction.objects.bulk_create(transactions)
+            if created:
+                Holding.objects.bulk_create(created)
+            if changed:
+                Holding.objects.bulk_update(changed, LEDGER_FIELDS)
+            if emptied:
+                Holding.objects.filter(pk__in=emptied).delete()
+
+            portfolio.save(update_fields=PORTFOLIO_FIELDS)
+
+        self._sync(portfolio)
+        return BasketResult(True, [], transactions)
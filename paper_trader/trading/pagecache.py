@@ -0,0 +1,131 @@
+"""Price-versioned caching for the read-heavy pages.
+
+Every instrument has a price version in the Django cache that changes
+whenever its price or stored bars change (``bump``). Rendered fragments and
+whole GET responses are stored under keys built from the versions they were
+rendered from, so a price update makes only the affected entries
+unreachable: nothing is deleted and other symbols stay cached. Each bump
+also moves the ``ALL`` version that pages listing every instrument use.
+
+Versions are timestamps, which gives cached pages a ``Last-Modified`` for
+free. With a cache every process shares (see ``CACHES``) a bump made by
+``refresh_prices`` reaches all web workers.
+"""
+
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import marketdata
+
+ALL = "*"
+
+
+def _version_key(symbol):
+    return f"price-version:{symbol}"
+
+
+def _hashed(kind, *parts):
+    return f"{kind}:{hashlib.md5(repr(parts).encode()).hexdigest()}"
+
+
+def bump(symbols):
+    """Give ``symbols`` (and ``ALL``) a new version, retiring everything built from the old one."""
+    symbols = set(symbols)
+    if symbols:
+        version = time.time_ns()
+        cache.set_many({_version_key(s): version for s in symbols | {ALL}}, timeout=None)
+
+
+async def abump(symbols):
+    await sync_to_async(bump)(symbols)
+
+
+def versions(symbols):
+    """Current versions of ``symbols``, in order.
+
+    A symbol without one (first use, or evicted) gets a fresh version, so it
+    can never match an entry rendered before the eviction.
+    """
+    keys = [_version_key(s) for s in symbols]
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return tuple(found[key] for key in keys)
+
+
+async def refresh_due(name, every):
+    """True at most once per ``every`` seconds for ``name``, across processes."""
+    return await cache.aadd(_hashed("refresh-due", name), True, timeout=every)
+
+
+def fragment(name, symbols, render):
+    """``render()`` once per version of ``symbols``, then straight from the cache."""
+    key = _hashed("fragment", name, versions(symbols))
+    content = cache.get(key)
+    if content is None:
+        content = render()
+        cache.set(key, content, settings.PAGE_CACHE_TIMEOUT)
+    return content
+
+
+def _lookup(symbols, parts):
+    current = versions(symbols)
+    key = _hashed("page", *parts, current)
+    return current, key, cache.get(key)
+
+
+async def cached_page(request, name, symbols, render, extra=()):
+    """Serve a GET page from the cache, or ``304`` when the browser's copy is current.
+
+    The page is identified by the versions of ``symbols`` plus ``extra``,
+    the other values it shows (a quote, a cash balance). It is cached per
+    browser because it carries the user's name and a CSRF token, and per
+    circuit-breaker state because the navbar shows it. ``render`` is
+    awaited only on a miss. Requests without a CSRF cookie yet, or with
+    flash messages waiting, are just rendered.
+
+    ``Last-Modified`` only tracks price versions, so pages with ``extra``
+    get no ``Last-Modified``. They revalidate by ``ETag`` alone.
+    """
+    storage = messages.get_messages(request)
+    if request.method != "GET" or settings.CSRF_COOKIE_NAME not in request.COOKIES or len(storage):
+        return await render()
+
+    parts = (
+        name,
+        request.get_full_path(),
+        request.user.pk,
+        request.COOKIES[settings.CSRF_COOKIE_NAME],
+        marketdata.breaker.state,
+        extra,
+    )
+    current, key, cached = await sync_to_async(_lookup)(symbols, parts)
+    etag = f'"{key.split(":", 1)[1]}"'
+    last_modified = None if extra else max(current) // 10**9
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None and cached is not None:
+        content, content_type = cached
+        response = HttpResponse(content, content_type=content_type)
+    elif response is None:
+        response = await render()
+        if response.status_code != 200 or response.streaming or storage.added_new:
+            return response
+        await cache.aset(key, (response.content, response["Content-Type"]), settings.PAGE_CACHE_TIMEOUT)
+
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Browsers keep the page but ask every time; proxies must not share it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
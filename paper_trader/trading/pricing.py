@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import marketdata, pagecache
+from .models import Instrument
+
+
+def apply_closes(instruments, histories, now=None):
+    """Copy the last two closes of each history onto its instrument.
+
+    Every instrument with usable history gets ``price_updated_at`` stamped;
+    the ones whose prices actually moved are returned.
+    """
+    now = now or timezone.now()
+    changed = []
+
+    for inst in instruments:
+        hist = histories.get(inst.symbol)
+        if hist is None or len(hist["Close"]) < 2:
+            continue
+
+        latest = Decimal(str(round(float(hist["Close"].iloc[-1]), 2)))
+        prev = Decimal(str(round(float(hist["Close"].iloc[-2]), 2)))
+        if inst.current_price != latest or inst.previous_close != prev:
+            changed.append(inst)
+        inst.current_price = latest
+        inst.previous_close = prev
+        inst.price_updated_at = now
+
+    return changed
+
+
+def refresh_instrument_prices(batch_size=None):
+    """Pull fresh closes for every instrument and bulk-write them back.
+
+    Returns the number of instruments that received a price.
+    """
+    batch_size = batch_size or settings.MARKET_DATA_BATCH_SIZE
+    instruments = list(Instrument.objects.order_by("symbol"))
+    refreshed = 0
+
+    for start in range(0, len(instruments), batch_size):
+        chunk = instruments[start:start + batch_size]
+        histories = marketdata.get_histories([inst.symbol for inst in chunk], period="5d", refresh=True)
+        now = timezone.now()
+        changed = apply_closes(chunk, histories, now)
+
+        fetched = [inst for inst in chunk if inst.price_updated_at == now]
+        if fetched:
+            Instrument.objects.bulk_update(fetched, ["current_price", "previous_close", "price_updated_at"])
+        pagecache.bump(inst.symbol for inst in changed)
+        refreshed += len(fetched)
+
+    return refreshed
@@ -0,0 +1,106 @@
+"""Instrument autocomplete from an in-memory prefix index.
+
+Each process builds a ``SymbolIndex`` from the instrument table the first
+time it is searched. The index keeps symbols, and names from each word
+onwards, in sorted arrays, so a lookup is a bisect plus a scan of at most
+``limit`` matches: microseconds over tens of thousands of instruments,
+with no query.
+
+Adding, renaming or deleting instruments calls ``invalidate``, which moves
+the universe version in the Django cache. A process compares its index
+against that version at most every ``SEARCH_INDEX_CHECK_INTERVAL`` seconds
+and rebuilds when it has moved, so with a shared cache (see ``CACHES``)
+a listing loaded by ``seed_instruments`` reaches every worker.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Instrument
+
+VERSION_KEY = "instrument-universe-version"
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+class SymbolIndex:
+    def __init__(self, instruments):
+        """``instruments`` is an iterable of ``(symbol, name)`` pairs."""
+        self.names = {}
+        phrases = []
+        for symbol, name in instruments:
+            self.names[symbol] = name
+            words = _normalize(name).split(" ")
+            # "apple inc" is found by "app", "apple i" and "inc"
+            phrases.extend((" ".join(words[i:]), symbol) for i in range(len(words)))
+        phrases.sort()
+        self._symbols = sorted(self.names)
+        self._phrases = [phrase for phrase, _ in phrases]
+        self._phrase_symbols = [symbol for _, symbol in phrases]
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query, limit=10):
+        """Up to ``limit`` ``{"symbol", "name"}`` matches for ``query``.
+
+        Symbols starting with the query come first (an exact symbol ahead of
+        longer ones), then instruments with a name word starting with it.
+        """
+        found = []
+        key = query.strip().upper()
+        if key:
+            found = self._scan(self._symbols, self._symbols, key, limit, found)
+            found = self._scan(self._phrases, self._phrase_symbols, _normalize(query), limit, found)
+        return [{"symbol": symbol, "name": self.names[symbol]} for symbol in found]
+
+    @staticmethod
+    def _scan(keys, symbols, prefix, limit, found):
+        i = bisect_left(keys, prefix)
+        while len(found) < limit and i < len(keys) and keys[i].startswith(prefix):
+            if symbols[i] not in found:
+                found.append(symbols[i])
+            i += 1
+        return found
+
+
+_index = None
+_version = None
+_checked = 0.0
+_lock = threading.Lock()
+
+
+def invalidate():
+    """Make every process rebuild its index before its next search."""
+    global _checked
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    _checked = 0.0  # this process notices straight away
+
+
+def get_index():
+    global _index, _version, _checked
+    now = time.monotonic()
+    if _index is not None and now - _checked < settings.SEARCH_INDEX_CHECK_INTERVAL:
+        return _index
+
+    with _lock:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # First use, or the cache was cleared: anything built so far may be stale
+            cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+            version = cache.get(VERSION_KEY)
+        if _index is None or version != _version:
+            _index = SymbolIndex(Instrument.objects.values_list("symbol", "name").iterator())
+            _version = version
+        _checked = now
+    return _index
+
+
+def search(query, limit=10):
+    return get_index().search(query, limit)
@@ -1,9 +1,36 @@
-from django.db.models.signals import post_migrate
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Portfolio
+from . import metrics, pagecache, search
+from .models import Instrument, Portfolio
 
-@receiver(post_migrate)
-def create_default_portfolio(sender, **kwargs):
-    if sender.name == "trading": 
-          if not Portfolio.objects.exists():
-            Portfolio.objects.create(cash_balance=10000)
\ No newline at end of file
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_portfolio(sender, instance, created, **kwargs):
+    if created:
+        Portfolio.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Instrument)
+def bump_price_version(sender, instance, **kwargs):
+    # bulk_update skips signals, so bulk price writes call pagecache.bump themselves
+    pagecache.bump([instance.symbol])
+
+
+@receiver(post_save, sender=Instrument)
+def refresh_search_index(sender, instance, created, update_fields, **kwargs):
+    # Price writes don't change what search finds; bulk loads invalidate themselves
+    if created or update_fields is None or {"symbol", "name"} & set(update_fields):
+        search.invalidate()
+
+
+@receiver(post_delete, sender=Instrument)
+def drop_from_search_index(sender, instance, **kwargs):
+    search.invalidate()
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    # Fires again on reconnect, but the wrapper list lives on the connection object
+    if metrics.query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.query_timer)
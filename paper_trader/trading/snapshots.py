@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Portfolio, PortfolioSnapshot
+from .valuation import holdings_values
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def bucket_start(moment, interval):
+    """Floor ``moment`` to the start of its ``interval``-second bucket."""
+    seconds = int((moment - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % interval)
+
+
+def take_snapshots(interval, now=None, batch_size=1000):
+    """Value every portfolio from stored prices and write one snapshot per bucket.
+
+    Running twice inside the same bucket is harmless: the unique
+    (portfolio, epoch, timestamp) constraint makes the second insert a no-op.
+    Returns the number of portfolios valued.
+    """
+    bucket = bucket_start(now or timezone.now(), interval)
+    granularity = PortfolioSnapshot.DAILY if interval >= 86400 else PortfolioSnapshot.INTRADAY
+    values = holdings_values()
+
+    snapshots = []
+    count = 0
+    portfolios = Portfolio.objects.values_list("id", "cash_balance", "epoch")
+    for portfolio_id, cash, epoch in portfolios.iterator(chunk_size=batch_size):
+        total = cash + (values.get(portfolio_id) or Decimal("0"))
+        snapshots.append(PortfolioSnapshot(
+            portfolio_id=portfolio_id,
+            epoch=epoch,
+            date=timezone.localdate(bucket),
+            timestamp=bucket,
+            granularity=granularity,
+            total_value=round(total, 2),
+        ))
+        if len(snapshots) >= batch_size:
+            PortfolioSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+            count += len(snapshots)
+            snapshots = []
+
+    if snapshots:
+        PortfolioSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+        count += len(snapshots)
+    return count
+
+
+def compact_snapshots(before):
+    """Fold intraday snapshots dated before ``before`` into one daily row per day.
+
+    The last snapshot of each day is kept (as that day's closing value) and
+    relabelled daily; the earlier ones are deleted. Returns rows deleted.
+    """
+    later_same_day = PortfolioSnapshot.objects.filter(
+        portfolio=OuterRef("portfolio"),
+        epoch=OuterRef("epoch"),
+        date=OuterRef("date"),
+        timestamp__gt=OuterRef("timestamp"),
+    )
+    old = PortfolioSnapshot.objects.filter(granularity=PortfolioSnapshot.INTRADAY, date__lt=before)
+
+    deleted, _ = old.filter(Exists(later_same_day)).delete()
+    old.update(granularity=PortfolioSnapshot.DAILY)
+    return deleted
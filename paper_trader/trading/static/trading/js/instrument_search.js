@@ -0,0 +1,39 @@
+// Instrument autocomplete for the navbar search box.
+//
+// Suggestions come from the server's in-memory prefix index as the user
+// types. Enter opens the typed symbol, or the first suggestion when the
+// text is part of a name rather than a symbol.
+(function () {
+  const DELAY = 100;  // ms of typing pause before asking the server
+
+  const form = document.getElementById('instrumentSearch');
+  if (!form) return;
+  const input = form.querySelector('input');
+  const list = document.getElementById(input.getAttribute('list'));
+  let pending = null;
+
+  input.addEventListener('input', () => {
+    clearTimeout(pending);
+    const query = input.value.trim();
+    if (!query) {
+      list.replaceChildren();
+      return;
+    }
+    pending = setTimeout(async () => {
+      const response = await fetch(`${form.dataset.searchUrl}?q=${encodeURIComponent(query)}`);
+      if (!response.ok) return;
+      const { results } = await response.json();
+      list.replaceChildren(...results.map(result => new Option(result.name, result.symbol)));
+    }, DELAY);
+  });
+
+  form.addEventListener('submit', event => {
+    event.preventDefault();
+    const typed = input.value.trim().toUpperCase();
+    const options = [...list.options].map(option => option.value);
+    const symbol = options.includes(typed) || !options.length ? typed : options[0];
+    if (symbol) {
+      window.location = form.dataset.detailUrl.replace('SYMBOL', encodeURIComponent(symbol));
+    }
+  });
+})();
@@ -0,0 +1,37 @@
+// Live price updates over server-sent events.
+//
+// Any element with data-live-price="SYMBOL" (or data-live-previous-close)
+// is kept current from the price stream. Symbols are split across a few
+// connections so each stays under the server's per-connection limit.
+(function () {
+  const CHUNK = 200;
+
+  function format(value) {
+    return value === null ? 'N/A' : '$' + value.toFixed(2);
+  }
+
+  function apply(prices) {
+    for (const [symbol, quote] of Object.entries(prices)) {
+      document.querySelectorAll(`[data-live-price="${symbol}"]`).forEach(el => {
+        if (el.textContent !== format(quote.price)) {
+          el.textContent = format(quote.price);
+          el.classList.add('price-flash');
+          setTimeout(() => el.classList.remove('price-flash'), 800);
+        }
+      });
+      document.querySelectorAll(`[data-live-previous-close="${symbol}"]`).forEach(el => {
+        el.textContent = format(quote.previous_close);
+      });
+    }
+  }
+
+  window.streamPrices = function (url) {
+    if (!window.EventSource) return;
+    const elements = document.querySelectorAll('[data-live-price]');
+    const symbols = [...new Set([...elements].map(el => el.dataset.livePrice))];
+    for (let i = 0; i < symbols.length; i += CHUNK) {
+      const source = new EventSource(`${url}?symbols=${symbols.slice(i, i + CHUNK).join(',')}`);
+      source.addEventListener('price', event => apply(JSON.parse(event.data)));
+    }
+  };
+})();
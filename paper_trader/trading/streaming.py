@@ -0,0 +1,134 @@
+"""Live price push: one shared upstream poller fanned out to every client.
+
+Each server process runs at most one poller task. It fetches the union of
+symbols that connected clients are watching once per
+``PRICE_STREAM_INTERVAL`` and puts changed prices on each subscriber's
+queue, so the upstream cost depends on the number of symbols, not on the
+number of open tabs. The poller starts with the first subscriber and stops
+when the last one disconnects.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import marketdata
+from .models import Instrument
+
+QUEUE_SIZE = 16  # ticks a slow client may fall behind before old ones are dropped
+
+logger = logging.getLogger("trading.streaming")
+
+
+class PriceBroadcaster:
+    def __init__(self):
+        self.subscribers = defaultdict(set)  # symbol -> {queue, ...}
+        self.latest = {}  # symbol -> {"price": ..., "previous_close": ...}
+        self._task = None
+
+    def symbols(self):
+        return sorted(symbol for symbol, queues in self.subscribers.items() if queues)
+
+    def subscribe(self, symbols):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        for symbol in symbols:
+            self.subscribers[symbol].add(queue)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        for symbol in list(self.subscribers):
+            self.subscribers[symbol].discard(queue)
+            if not self.subscribers[symbol]:
+                del self.subscribers[symbol]
+
+    def publish(self, prices):
+        """Send each subscriber the subset of ``prices`` that changed and that it watches."""
+        changed = {s: p for s, p in prices.items() if self.latest.get(s) != p}
+        self.latest.update(changed)
+
+        batches = defaultdict(dict)
+        for symbol, price in changed.items():
+            for queue in self.subscribers.get(symbol, ()):
+                batches[queue][symbol] = price
+        for queue, batch in batches.items():
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(batch)
+
+    async def poll(self):
+        symbols = self.symbols()
+        if symbols:
+            self.publish(await fetch_prices(symbols))
+
+    async def _run(self):
+        while self.subscribers:
+            try:
+                await self.poll()
+            except marketdata.MarketDataError:
+                pass  # keep streaming; the next interval may succeed
+            except Exception:
+                # A database or provider bug must not silently end every client's stream.
+                # CancelledError is not an Exception, so stopping the task still works.
+                logger.exception("Price stream poll failed")
+            await asyncio.sleep(settings.PRICE_STREAM_INTERVAL)
+        self._task = None
+
+
+async def fetch_prices(symbols):
+    """``{symbol: {"price", "previous_close"}}`` from stored prices or one batched quote fan-out.
+
+    Stored prices are also used while the vendor's circuit breaker is open.
+    """
+    if settings.MARKET_DATA_USE_STORED_PRICES or marketdata.offline():
+        rows = Instrument.objects.filter(symbol__in=symbols).values_list("symbol", "current_price", "previous_close")
+        return {
+            symbol: {"price": _number(price), "previous_close": _number(previous)}
+            async for symbol, price, previous in rows
+        }
+
+    quotes, _ = await marketdata.aget_quotes(symbols)
+    return {
+        symbol: {"price": _number(quote.price), "previous_close": _number(quote.previous_close)}
+        for symbol, quote in quotes.items()
+        if quote.price is not None
+    }
+
+
+def _number(value):
+    return None if value is None else round(float(value), 2)
+
+
+def sse_event(data, event="price"):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+broadcaster = PriceBroadcaster()
+
+
+async def price_events(symbols):
+    """Server-sent events for ``symbols``: the last known prices, then every change."""
+    queue = broadcaster.subscribe(symbols)
+    try:
+        known = {s: broadcaster.latest[s] for s in symbols if s in broadcaster.latest}
+        missing = [s for s in symbols if s not in known]
+        if missing:
+            rows = Instrument.objects.filter(symbol__in=missing).values_list("symbol", "current_price", "previous_close")
+            async for symbol, price, previous in rows:
+                known[symbol] = {"price": _number(price), "previous_close": _number(previous)}
+        yield sse_event(known)
+
+        while True:
+            try:
+                batch = await asyncio.wait_for(queue.get(), timeout=settings.PRICE_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"  # stops proxies closing an idle connection
+                continue
+            yield sse_event(batch)
+    finally:
+        broadcaster.unsubscribe(queue)
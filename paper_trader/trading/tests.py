@@ -1,16 +1,48 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient, TestCase, override_settings
 from django.urls import reverse
+from unittest import skipUnless
 from unittest.mock import patch, MagicMock
+import asyncio
+import importlib.util
+import json
+import math
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
 from decimal import Decimal
 import pandas as pd
 import datetime as dt
 
-from .models import Instrument, Portfolio, Holding, Transaction
+from . import marketdata, metrics, pagecache, search
+from .marketdata import CircuitBreaker, MarketDataError, QuoteCache, Quote, VendorUnavailable
+from .marketdata.local import LocalProvider
+from .analytics import performance
+from .backtest import load_closes, simulate, sweep
+from .bars import sync_bars
+from .snapshots import compact_snapshots, take_snapshots
+from .valuation import refresh_leaderboard, valued_portfolios
+from .matching import MatchingEngine
+from .streaming import PriceBroadcaster
+from .models import (
+    Instrument, Portfolio, Holding, Transaction, PriceBar, PortfolioSnapshot, PortfolioValuation, Order, BacktestRun,
+)
+from .orders import OrderService
 
 
 class TradingAppTests(TestCase):
     def setUp(self):
-        self.portfolio = Portfolio.objects.create(cash_balance=Decimal("10000.00"))
+        marketdata.reset()
+        cache.clear()
+        self.user = User.objects.create_user("trader")
+        self.client.force_login(self.user)
+        self.portfolio = self.user.portfolio
         self.instrument = Instrument.objects.create(symbol="TEST", name="Test Instrument")
 
     def mock_yf_data(self, mock_ticker_class):
@@ -26,7 +58,7 @@ class TradingAppTests(TestCase):
         mock_ticker.history.return_value = hist_df
         mock_ticker_class.return_value = mock_ticker
 
-    @patch("trading.views.yf.Ticker")
+    @patch("trading.marketdata.yahoo.yf.Ticker")
     def test_buy_valid_quantity(self, mock_ticker_class):
         self.mock_yf_data(mock_ticker_class)
 
@@ -38,7 +70,7 @@ class TradingAppTests(TestCase):
         self.assertContains(response, "Bought 10 shares of TEST")
         self.assertEqual(Holding.objects.get().quantity, 10)
 
-    @patch("trading.views.yf.Ticker")
+    @patch("trading.marketdata.yahoo.yf.Ticker")
     def test_buy_invalid_quantity(self, mock_ticker_class):
         self.mock_yf_data(mock_ticker_class)
 
@@ -50,11 +82,9 @@ class TradingAppTests(TestCase):
         self.assertContains(response, "Invalid quantity entered")
         self.assertFalse(Holding.objects.exists())
 
-    @patch("trading.views.Portfolio.objects.first")
-    @patch("trading.views.yf.Ticker")
-    def test_sell_valid_quantity(self, mock_ticker_class, mock_portfolio_first):
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    def test_sell_valid_quantity(self, mock_ticker_class):
         self.mock_yf_data(mock_ticker_class)
-        mock_portfolio_first.return_value = self.portfolio
 
         Holding.objects.create(
         portfolio=self.portfolio, instrument=self.instrument, quantity=10
@@ -69,11 +99,9 @@ class TradingAppTests(TestCase):
         self.assertEqual(Holding.objects.get().quantity, 5)
 
 
-    @patch("trading.views.Portfolio.objects.first")
-    @patch("trading.views.yf.Ticker")
-    def test_sell_invalid_quantity(self, mock_ticker_class, mock_portfolio_first):
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    def test_sell_invalid_quantity(self, mock_ticker_class):
         self.mock_yf_data(mock_ticker_class)
-        mock_portfolio_first.return_value = self.portfolio
 
         Holding.objects.create(
             portfolio=self.portfolio, instrument=self.instrument, quantity=2
@@ -86,7 +114,7 @@ class TradingAppTests(TestCase):
         )
         self.assertContains(response, "You don’t own that many shares")
 
-    @patch("trading.views.yf.Ticker")
+    @patch("trading.marketdata.yahoo.yf.Ticker")
     def test_reset_portfolio(self, mock_ticker_class):
         self.mock_yf_data(mock_ticker_class)
 
@@ -106,10 +134,993 @@ class TradingAppTests(TestCase):
         self.portfolio.refresh_from_db()
 
         self.assertEqual(self.portfolio.cash_balance, Decimal("10000.00"))
+        self.assertEqual(self.portfolio.epoch, 1)
         self.assertFalse(Holding.objects.exists())
+        self.assertEqual(response.context["transactions"], [])
+
+        # The old run is only hidden until the purge job deletes it
+        out = StringIO()
+        with self.assertNumQueries(4):  # select and fast-delete one batch, then one empty select per model
+            call_command("purge_epochs", "--batch-size", "1", stdout=out)
+        self.assertIn("Purged 1 transactions", out.getvalue())
         self.assertFalse(Transaction.objects.exists())
 
+    def test_views_are_scoped_to_the_logged_in_user(self):
+        other = User.objects.create_user("other").portfolio
+        Holding.objects.create(portfolio=other, instrument=self.instrument, quantity=3)
+        Transaction.objects.create(
+            instrument=self.instrument, portfolio=other, type="BUY", quantity=3, price=Decimal("100")
+        )
+
+        with self.settings(MARKET_DATA_USE_STORED_PRICES=True):
+            response = self.client.get(reverse("portfolio"))
+        self.assertEqual(response.context["portfolio"], self.portfolio)
+        self.assertEqual(response.context["holdings"], [])
+
+        self.client.post(reverse("reset_portfolio"))
+        self.assertEqual(Holding.objects.get().portfolio, other)
+        self.assertEqual(Transaction.objects.get().portfolio, other)
+
+        self.client.logout()
+        response = self.client.get(reverse("portfolio"))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('portfolio')}")
+
+    def test_generate_load_data_builds_consistent_ledgers(self):
+        out = StringIO()
+        call_command("generate_load_data", "--users", "3", "--trades", "8", "--instruments", "4", stdout=out)
+
+        self.assertIn("Created 3 users with 8 trades each", out.getvalue())
+        self.assertEqual(Transaction.objects.filter(portfolio__user__username__startswith="loadtest").count(), 24)
+        out = StringIO()
+        call_command("rebuild_ledger", "--dry-run", stdout=out)
+        self.assertIn("Found 0 mismatches", out.getvalue())
+
     def test_instrument_list_view(self):
         response = self.client.get(reverse("instrument_list"))
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.instrument.symbol)
+
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    def test_quotes_served_from_cache_within_ttl(self, mock_ticker_class):
+        self.mock_yf_data(mock_ticker_class)
+
+        self.client.get(reverse("instrument_detail", args=[self.instrument.symbol]))
+        self.client.get(reverse("instrument_detail", args=[self.instrument.symbol]))
+
+        # One Ticker for the history and one for the quote, none on the second view
+        self.assertEqual(mock_ticker_class.call_count, 2)
+        self.assertGreater(marketdata.quote_cache.hits, 0)
+
+
+    @patch("trading.marketdata.yahoo.yf.download")
+    def test_instrument_list_fetches_prices_in_one_batch(self, mock_download):
+        Instrument.objects.create(symbol="OTHER", name="Other Instrument", current_price=0)
+        dates = pd.date_range(end=dt.datetime.now(), periods=5)
+        mock_download.return_value = pd.concat(
+            {
+                "OTHER": pd.DataFrame({"Close": [10, 11, 12, 13, 14]}, index=dates),
+                "TEST": pd.DataFrame({"Close": [100, 101, 102, 99, 100]}, index=dates),
+            },
+            axis=1,
+        )
+
+        # Instruments plus one bulk UPDATE, after the session and user lookups
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("instrument_list"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_download.call_count, 1)
+        self.assertEqual(Instrument.objects.get(symbol="OTHER").current_price, Decimal("14.00"))
+        self.assertEqual(Instrument.objects.get(symbol="TEST").current_price, Decimal("100.00"))
+
+    @override_settings(MARKET_DATA_QUOTE_TIMEOUT=0.2, MARKET_DATA_FANOUT_DEADLINE=0.5)
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    def test_portfolio_falls_back_to_stored_price_for_slow_quotes(self, mock_ticker_class):
+        slow = Instrument.objects.create(symbol="SLOW", name="Slow Instrument", current_price=Decimal("50.00"))
+        Holding.objects.create(portfolio=self.portfolio, instrument=self.instrument, quantity=1)
+        Holding.objects.create(portfolio=self.portfolio, instrument=slow, quantity=2)
+
+        def make_ticker(symbol):
+            ticker = MagicMock()
+            if symbol == "SLOW":
+                time.sleep(1)
+            ticker.info = {"regularMarketPrice": 100}
+            return ticker
+
+        mock_ticker_class.side_effect = make_ticker
+
+        started = time.monotonic()
+        response = self.client.get(reverse("portfolio"))
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.context["stale_symbols"], ["SLOW"])
+        # 10000 cash + 1 x 100 live + 2 x 50 stored
+        self.assertEqual(response.context["total_value"], Decimal("10200.00"))
+
+    @override_settings(MARKET_DATA_PROVIDER="local")
+    def test_refresh_prices_once_stores_prices(self):
+        out = StringIO()
+        call_command("refresh_prices", "--once", stdout=out)
+
+        self.instrument.refresh_from_db()
+        self.assertIn("Refreshed", out.getvalue())
+        self.assertIsNotNone(self.instrument.price_updated_at)
+        self.assertGreater(self.instrument.current_price, 0)
+
+    @override_settings(MARKET_DATA_USE_STORED_PRICES=True)
+    @patch("trading.marketdata.yahoo.yf.download")
+    def test_instrument_list_reads_stored_prices(self, mock_download):
+        Instrument.objects.filter(pk=self.instrument.pk).update(
+            current_price=Decimal("42.00"), previous_close=Decimal("41.00")
+        )
+
+        response = self.client.get(reverse("instrument_list"))
+
+        mock_download.assert_not_called()
+        self.assertEqual(response.context["instruments"][0]["price"], Decimal("42.00"))
+
+    @override_settings(MARKET_DATA_PROVIDER="local")
+    def test_sync_bars_only_downloads_new_bars(self):
+        written = sync_bars([self.instrument])
+        self.assertGreater(written, 200)
+        self.assertEqual(PriceBar.objects.filter(instrument=self.instrument).count(), written)
+
+        # Already up to date: nothing is downloaded
+        with patch("trading.bars.marketdata.get_histories") as mock_histories:
+            sync_bars([self.instrument])
+        mock_histories.assert_not_called()
+
+        # Two bars missing: only those are requested
+        last_two = PriceBar.objects.order_by("-date")[:2]
+        start = list(last_two)[-1].date
+        PriceBar.objects.filter(date__gte=start).delete()
+        written_again = sync_bars([self.instrument])
+        self.assertEqual(PriceBar.objects.filter(instrument=self.instrument).count(), written)
+        self.assertLessEqual(written_again, 3)
+
+    @override_settings(MARKET_DATA_USE_STORED_PRICES=True)
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    def test_pages_are_cached_per_price_version(self, mock_ticker_class):
+        self.mock_yf_data(mock_ticker_class)
+        other = Instrument.objects.create(symbol="OTHER", name="Other Instrument", current_price=5)
+        self.instrument.current_price = Decimal("20.00")
+        self.instrument.save()
+        list_url = reverse("instrument_list")
+        detail_url = reverse("instrument_detail", args=["TEST"])
+
+        self.client.get(list_url)  # sets the CSRF cookie
+        first = self.client.get(list_url)
+        detail = self.client.get(detail_url)
+        with self.assertNumQueries(2):  # session and user only
+            cached = self.client.get(list_url)
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        # A change to one symbol retires the list but not the other symbol's page
+        other.current_price = 6
+        other.save()
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail["ETag"]).status_code, 304)
+
+        # Bulk writes bypass the save() signal and bump explicitly
+        Instrument.objects.filter(pk=self.instrument.pk).update(current_price=30)
+        pagecache.bump(["TEST"])
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail["ETag"]).status_code, 200)
+
+    @override_settings(MARKET_DATA_USE_STORED_PRICES=True)
+    def test_cached_pages_follow_the_breaker_state(self):
+        list_url = reverse("instrument_list")
+        self.client.get(list_url)  # sets the CSRF cookie
+        live = self.client.get(list_url)
+        self.assertContains(live, "Live data")
+
+        for _ in range(settings.MARKET_DATA_BREAKER_MIN_CALLS):
+            marketdata.breaker.record_failure()
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=live["ETag"]).status_code, 200)
+        self.assertContains(self.client.get(list_url), "Offline: last known prices")
+
+    @override_settings(MARKET_DATA_PROVIDER="local")
+    def test_pages_with_extra_values_revalidate_by_etag_only(self):
+        self.instrument.current_price = Decimal("20.00")
+        self.instrument.save()
+        detail_url = reverse("instrument_detail", args=["TEST"])
+        self.client.get(detail_url)  # sets the CSRF cookie
+        detail = self.client.get(detail_url)
+
+        self.assertNotIn("Last-Modified", detail)
+        self.assertIn("Last-Modified", self.client.get(reverse("instrument_list")))
+        # A trade changes the cash balance shown without bumping any price
+        Portfolio.objects.filter(pk=self.portfolio.pk).update(cash_balance=Decimal("5000"))
+        self.assertEqual(
+            self.client.get(detail_url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT").status_code, 200
+        )
+
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    def test_instrument_detail_chart_reads_stored_bars(self, mock_ticker_class):
+        self.mock_yf_data(mock_ticker_class)
+
+        response = self.client.get(reverse("instrument_detail", args=[self.instrument.symbol]))
+
+        self.assertEqual(PriceBar.objects.filter(instrument=self.instrument).count(), 5)
+        self.assertEqual(response.context["close_prices_json"], "[100.0, 101.0, 102.0, 99.0, 100.0]")
+
+    @override_settings(MARKET_DATA_PROVIDER="local")
+    def test_history_api_is_columnar_and_supports_etag(self):
+        Instrument.objects.create(symbol="OTHER", name="Other Instrument", current_price=0)
+        url = reverse("history_api") + "?symbols=TEST,OTHER"
+
+        response = self.client.get(url)
+        data = response.json()
+
+        self.assertEqual(set(data["series"]), {"TEST", "OTHER"})
+        self.assertEqual(len(data["series"]["TEST"]), len(data["dates"]))
+        self.assertEqual(len(data["series"]["OTHER"]), len(data["dates"]))
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        gzipped = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+
+    @override_settings(MARKET_DATA_USE_STORED_PRICES=True)
+    def test_history_api_caches_each_symbol_list_separately(self):
+        Instrument.objects.create(symbol="OTHER", name="Other Instrument", current_price=0)
+        pagecache.bump(["TEST", "OTHER"])  # one shared version for both
+
+        test = self.client.get(reverse("history_api") + "?symbols=TEST").json()
+        other = self.client.get(reverse("history_api") + "?symbols=OTHER").json()
+
+        self.assertEqual(list(test["series"]), ["TEST"])
+        self.assertEqual(list(other["series"]), ["OTHER"])
+
+    @patch("trading.views.async_sync_bars")
+    def test_history_api_syncs_named_symbols_once_per_interval(self, mock_sync):
+        Instrument.objects.create(symbol="OTHER", name="Other Instrument", current_price=0)
+
+        self.client.get(reverse("history_api") + "?symbols=TEST,OTHER")
+        self.client.get(reverse("history_api") + "?symbols=OTHER")
+        self.client.get(reverse("history_api"))
+
+        mock_sync.assert_called_once()
+        self.assertEqual(sorted(inst.symbol for inst in mock_sync.call_args.args[0]), ["OTHER", "TEST"])
+
+    def test_history_api_rejects_bad_dates(self):
+        response = self.client.get(reverse("history_api") + "?start=yesterday")
+        self.assertEqual(response.status_code, 400)
+
+    def _add_positions(self, count, trades_each, prefix="P"):
+        for i in range(count):
+            inst = Instrument.objects.create(symbol=f"{prefix}{i}", name=f"Position {i}", current_price=Decimal("10"))
+            Holding.objects.create(portfolio=self.portfolio, instrument=inst, quantity=1)
+            Transaction.objects.bulk_create(
+                Transaction(portfolio=self.portfolio, instrument=inst, type="BUY", quantity=1, price=10)
+                for _ in range(trades_each)
+            )
+
+    def _portfolio_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("portfolio"))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    @override_settings(MARKET_DATA_USE_STORED_PRICES=True)
+    def test_portfolio_query_count_is_constant(self):
+        self._add_positions(1, 1)
+        self._portfolio_query_count()  # warm up the session
+        small = self._portfolio_query_count()
+
+        self._add_positions(20, 10, prefix="Q")
+        large = self._portfolio_query_count()
+
+        self.assertEqual(small, large)
+
+    @override_settings(MARKET_DATA_USE_STORED_PRICES=True)
+    def test_portfolio_transactions_are_paginated_by_cursor(self):
+        self._add_positions(1, 60)
+
+        first = self.client.get(reverse("portfolio"))
+        second = self.client.get(reverse("portfolio"), {"before": first.context["next_cursor"]})
+
+        self.assertEqual(len(first.context["transactions"]), 50)
+        self.assertEqual(len(second.context["transactions"]), 10)
+        self.assertIsNone(second.context["next_cursor"])
+        seen = {tx.pk for tx in first.context["transactions"]} | {tx.pk for tx in second.context["transactions"]}
+        self.assertEqual(len(seen), 60)
+
+
+class OrderServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("trader")
+        self.client.force_login(self.user)
+        self.portfolio = self.user.portfolio
+        self.portfolio.cash_balance = Decimal("1000.00")
+        self.portfolio.save()
+        self.instrument = Instrument.objects.create(symbol="TEST", name="Test Instrument", current_price=0)
+        self.service = OrderService(self.portfolio)
+
+    def test_buy_then_sell_updates_cash_holding_and_transactions(self):
+        bought = self.service.buy(self.instrument, 4, Decimal("100"))
+        sold = self.service.sell(self.instrument, 4, Decimal("110"))
+
+        self.assertTrue(bought.success)
+        self.assertTrue(sold.success)
+        self.assertEqual(sold.transaction.type, Transaction.SELL)
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.cash_balance, Decimal("1040.00"))
+        self.assertEqual(self.portfolio.realized_pnl, Decimal("40.00"))
+        self.assertEqual(self.portfolio.total_cost, Decimal("0.00"))
+        self.assertFalse(Holding.objects.exists())
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_cost_basis_is_maintained_and_matches_rebuild(self):
+        self.service.buy(self.instrument, 2, Decimal("100"))
+        self.service.buy(self.instrument, 2, Decimal("110"))
+        self.service.sell(self.instrument, 1, Decimal("120"))
+
+        holding = Holding.objects.get()
+        self.assertEqual(holding.average_cost, Decimal("105.0000"))
+        self.assertEqual(holding.total_cost, Decimal("315.00"))
+        self.assertEqual(holding.realized_pnl, Decimal("15.00"))
+
+        out = StringIO()
+        call_command("rebuild_ledger", "--dry-run", stdout=out)
+        self.assertIn("Found 0 mismatches", out.getvalue())
+
+        Holding.objects.update(total_cost=0, average_cost=0)
+        call_command("rebuild_ledger", stdout=StringIO())
+        holding.refresh_from_db()
+        self.assertEqual(holding.total_cost, Decimal("315.00"))
+        self.assertEqual(holding.average_cost, Decimal("105.0000"))
+
+    def test_rebuild_ledger_queries_do_not_grow_with_portfolios(self):
+        self.service.buy(self.instrument, 2, Decimal("100"))
+        for i in range(5):
+            portfolio = User.objects.create_user(f"trader{i}").portfolio
+            OrderService(portfolio).buy(self.instrument, 1, Decimal("100"))
+
+        out = StringIO()
+        with self.assertNumQueries(3):
+            call_command("rebuild_ledger", "--dry-run", stdout=out)
+        self.assertIn("Checked 6 portfolios. Found 0 mismatches", out.getvalue())
+
+    def test_reset_cost_does_not_grow_with_history(self):
+        self.service.buy(self.instrument, 1, Decimal("100"))
+        Transaction.objects.bulk_create(
+            Transaction(portfolio=self.portfolio, instrument=self.instrument, type="BUY", quantity=1, price=1)
+            for _ in range(500)
+        )
+        PortfolioSnapshot.objects.create(portfolio=self.portfolio, total_value=Decimal("1000"))
+
+        with self.assertNumQueries(6):  # savepoint, lock, delete holdings, cancel orders, update portfolio, release
+            self.service.reset()
+
+        self.assertEqual(self.portfolio.epoch, 1)
+        self.assertEqual(self.portfolio.cash_balance, Decimal("10000.00"))
+        self.assertEqual(self.client.get(reverse("portfolio_analytics_api")).json()["values"], [])
+        self.assertEqual(Transaction.objects.count(), 501)
+
+    def test_rejected_orders_leave_balances_untouched(self):
+        result = self.service.buy(self.instrument, 11, Decimal("100"))
+        self.assertFalse(result.success)
+        self.assertEqual(result.message, "Insufficient cash to complete purchase.")
+
+        result = self.service.sell(self.instrument, 1, Decimal("100"))
+        self.assertFalse(result.success)
+
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.cash_balance, Decimal("1000.00"))
+        self.assertFalse(Transaction.objects.exists())
+
+    @patch("trading.views.marketdata.aget_quotes")
+    def test_basket_api_executes_orders_in_constant_queries(self, mock_get_quotes):
+        other = Instrument.objects.create(symbol="OTHER", name="Other Instrument", current_price=0)
+        Holding.objects.create(portfolio=self.portfolio, instrument=other, quantity=5)
+        mock_get_quotes.return_value = (
+            {"TEST": Quote("TEST", 100), "OTHER": Quote("OTHER", 20)},
+            [],
+        )
+        basket = {"orders": [
+            {"symbol": "TEST", "side": "BUY", "quantity": 3},
+            {"symbol": "OTHER", "side": "SELL", "quantity": 5},
+        ]}
+
+        with self.assertNumQueries(12):
+            response = self.client.post(reverse("basket_api"), basket, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.cash_balance, Decimal("800.00"))
+        self.assertEqual(Holding.objects.get().instrument, self.instrument)
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    @patch("trading.views.marketdata.aget_quotes")
+    def test_basket_api_rejects_whole_basket(self, mock_get_quotes):
+        mock_get_quotes.return_value = ({"TEST": Quote("TEST", 100)}, [])
+        basket = {"orders": [
+            {"symbol": "TEST", "side": "BUY", "quantity": 1},
+            {"symbol": "TEST", "side": "BUY", "quantity": 1000},
+        ]}
+
+        response = self.client.post(reverse("basket_api"), basket, content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("TEST: insufficient cash.", response.json()["errors"])
+        self.assertFalse(Transaction.objects.exists())
+
+class MatchingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("trader")
+        self.client.force_login(self.user)
+        self.portfolio = self.user.portfolio
+        self.instrument = Instrument.objects.create(symbol="TEST", name="Test Instrument", current_price=Decimal("90"))
+
+    def _order(self, side, kind, trigger, quantity=10):
+        return Order.objects.create(
+            portfolio=self.portfolio, instrument=self.instrument, side=side, kind=kind,
+            quantity=quantity, trigger_price=Decimal(trigger),
+        )
+
+    def test_engine_pops_only_triggered_orders(self):
+        engine = MatchingEngine()
+        buy_limit = self._order("BUY", Order.LIMIT, "95")
+        deep_limit = self._order("BUY", Order.LIMIT, "50")
+        buy_stop = self._order("BUY", Order.STOP, "100")
+        sell_limit = self._order("SELL", Order.LIMIT, "120")
+        sell_stop = self._order("SELL", Order.STOP, "80")
+        self.assertEqual(engine.load(), 5)
+
+        self.assertEqual(engine.on_price("TEST", Decimal("90")), [buy_limit])
+        self.assertEqual(engine.on_price("TEST", Decimal("100")), [buy_stop])
+        self.assertEqual(engine.on_price("TEST", Decimal("130")), [sell_limit])
+        self.assertEqual(engine.on_price("TEST", Decimal("40")), [sell_stop, deep_limit])
+        self.assertEqual(len(engine), 0)
+        self.assertEqual(engine.load(), 0)
+
+    def test_engine_loads_late_commits_and_drops_closed_orders(self):
+        engine = MatchingEngine()
+        first = self._order("BUY", Order.LIMIT, "95")
+        gap = self._order("BUY", Order.LIMIT, "94")
+        last = self._order("SELL", Order.LIMIT, "120")
+        gap_pk = gap.pk
+        gap.delete()
+        self.assertEqual(engine.load(), 2)
+
+        # Committed after a higher id was already loaded
+        late = Order.objects.create(
+            pk=gap_pk, portfolio=self.portfolio, instrument=self.instrument, side="BUY", kind=Order.LIMIT,
+            quantity=10, trigger_price=Decimal("94"),
+        )
+        Order.objects.filter(pk=first.pk).update(status=Order.CANCELLED)
+        self.assertEqual(engine.load(), 1)
+        self.assertEqual(len(engine), 2)
+
+        self.assertEqual(engine.on_price("TEST", Decimal("90")), [late])
+        Order.objects.filter(pk=last.pk).update(status=Order.CANCELLED)
+        engine.load()
+        self.assertEqual(len(engine), 0)
+        self.assertEqual(engine.symbols(), [])
+        self.assertEqual(engine.on_price("TEST", Decimal("130")), [])
+
+    @override_settings(MARKET_DATA_USE_STORED_PRICES=True)
+    def test_match_orders_fills_triggered_orders(self):
+        buy = self._order("BUY", Order.LIMIT, "95")
+        stop = self._order("SELL", Order.STOP, "80", quantity=4)
+        cancelled = self._order("BUY", Order.LIMIT, "100")
+        self.client.post(reverse("cancel_order", args=[cancelled.pk]))
+
+        call_command("match_orders", "--once", stdout=StringIO())
+        buy.refresh_from_db()
+        self.assertEqual(buy.status, Order.FILLED)
+        self.assertEqual(buy.fill_price, Decimal("90.00"))
+        self.assertEqual(Holding.objects.get().quantity, 10)
+        self.assertEqual(Order.objects.get(pk=cancelled.pk).status, Order.CANCELLED)
+
+        Instrument.objects.update(current_price=Decimal("75"))
+        call_command("match_orders", "--once", stdout=StringIO())
+        stop.refresh_from_db()
+        self.assertEqual(stop.status, Order.FILLED)
+        self.assertEqual(Holding.objects.get().quantity, 6)
+        self.assertEqual(Transaction.objects.count(), 2)
+
+
+class BacktestTests(TestCase):
+    def setUp(self):
+        days = pd.bdate_range("2024-01-01", periods=200)
+        bars = []
+        for symbol, phase in [("AAA", 0), ("BBB", 2)]:
+            inst = Instrument.objects.create(symbol=symbol, name=symbol, current_price=Decimal("100"))
+            for i, day in enumerate(days):
+                close = Decimal(str(round(100 + 20 * math.sin(i / 15 + phase), 2)))
+                bars.append(PriceBar(instrument=inst, date=day.date(), open=close, high=close, low=close, close=close))
+        PriceBar.objects.bulk_create(bars)
+        self.start, self.end = days[0].date(), days[-1].date()
+
+    def test_backtest_command_replays_bars_and_saves_in_bulk(self):
+        out = StringIO()
+        call_command(
+            "backtest", "--symbols", "AAA,BBB", "--start", str(self.start), "--end", str(self.end),
+            "--fast", "5", "--slow", "20", "--position-size", "0.5", "--save", stdout=out,
+        )
+
+        self.assertIn("Backtested 1 parameter set(s) over 2 symbols", out.getvalue())
+        run = BacktestRun.objects.get()
+        self.assertEqual(len(run.equity["dates"]), 200)
+        self.assertGreater(run.trades.count(), 4)
+        self.assertIsNotNone(run.metrics["max_drawdown"])
+
+        result = simulate(load_closes(["AAA", "BBB"], self.start, self.end), fast=5, slow=20, position_size=0.5)
+        self.assertGreaterEqual(result.cash, 0)
+        self.assertEqual(run.final_value, Decimal(str(result.final_value)))
+
+    def test_sweep_fans_out_across_processes(self):
+        grid = {"fast": [5, 10], "slow": [20]}
+
+        pooled = sweep(["AAA", "BBB"], self.start, self.end, grid, workers=2)
+        inline = sweep(["AAA", "BBB"], self.start, self.end, grid, workers=1)
+
+        self.assertEqual([r.params["fast"] for r in pooled], [5, 10])
+        self.assertEqual([r.final_value for r in pooled], [r.final_value for r in inline])
+        self.assertEqual(pooled[0].metrics, inline[0].metrics)
+
+
+class PriceStreamTests(TestCase):
+    @override_settings(PRICE_STREAM_INTERVAL=60)
+    @patch("trading.streaming.marketdata.aget_quotes")
+    async def test_one_upstream_fetch_fans_out_to_every_client(self, mock_get_quotes):
+        mock_get_quotes.return_value = ({"TEST": Quote("TEST", 101.5, 100)}, [])
+        broadcaster = PriceBroadcaster()
+
+        queues = [broadcaster.subscribe(["TEST"]) for _ in range(500)]
+        ticks = await asyncio.wait_for(asyncio.gather(*(q.get() for q in queues)), timeout=5)
+
+        self.assertEqual(mock_get_quotes.call_count, 1)
+        self.assertEqual(ticks[0], {"TEST": {"price": 101.5, "previous_close": 100.0}})
+        for queue in queues:
+            broadcaster.unsubscribe(queue)
+        broadcaster._task.cancel()
+
+    @override_settings(PRICE_STREAM_INTERVAL=0.01)
+    @patch("trading.streaming.marketdata.aget_quotes")
+    async def test_poller_survives_unexpected_errors(self, mock_get_quotes):
+        mock_get_quotes.side_effect = [
+            RuntimeError("database went away"),
+            ({"TEST": Quote("TEST", 101.5, 100)}, []),
+        ]
+        broadcaster = PriceBroadcaster()
+        queue = broadcaster.subscribe(["TEST"])
+
+        with self.assertLogs("trading.streaming", "ERROR"):
+            tick = await asyncio.wait_for(queue.get(), timeout=5)
+
+        self.assertEqual(tick, {"TEST": {"price": 101.5, "previous_close": 100.0}})
+        self.assertFalse(broadcaster._task.done())
+        broadcaster.unsubscribe(queue)
+        broadcaster._task.cancel()
+
+    @override_settings(MARKET_DATA_USE_STORED_PRICES=True, PRICE_STREAM_INTERVAL=0.05)
+    async def test_stream_starts_with_stored_prices(self):
+        await Instrument.objects.acreate(symbol="TEST", name="Test", current_price=Decimal("42.00"))
+        client = AsyncClient()
+        await client.aforce_login(await User.objects.acreate(username="trader"))
+
+        response = await client.get(reverse("price_stream"), {"symbols": "test,NOSUCH"})
+        events = aiter(response.streaming_content)
+        first = await anext(events)
+        await events.aclose()
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(first, b'event: price\ndata: {"TEST":{"price":42.0,"previous_close":null}}\n\n')
+
+    def test_stream_requires_login_and_listed_symbols(self):
+        url = reverse("price_stream")
+        self.assertEqual(self.client.get(url, {"symbols": "TEST"}).status_code, 302)
+
+        self.client.force_login(User.objects.create_user("trader"))
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {"symbols": "JUNK1,JUNK2"}).status_code, 400)
+
+
+class MarketDataTests(TestCase):
+    def test_cache_expires_and_evicts(self):
+        cache = QuoteCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=0)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+        cache.set("c", 3)
+        cache.set("d", 4)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    @override_settings(MARKET_DATA_PROVIDER="local")
+    def test_each_quote_lookup_is_counted_once(self):
+        marketdata.reset()
+        self.addCleanup(marketdata.reset)
+
+        token = metrics.start()
+        marketdata.get_quotes(["AAA", "BBB"])
+        marketdata.get_quote("AAA")
+        asyncio.run(marketdata.aget_quote("CCC"))
+        stats = metrics.stop(token)
+
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (1, 3))
+        self.assertEqual(marketdata.quote_cache.stats()["misses"], 3)
+
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    async def test_async_quotes_are_fetched_concurrently_with_timeouts(self, mock_ticker_class):
+        marketdata.reset()
+        cache.clear()
+
+        def make_ticker(symbol):
+            time.sleep(2 if symbol == "SLOW" else 0.3)
+            ticker = MagicMock()
+            ticker.info = {"regularMarketPrice": 10}
+            return ticker
+
+        mock_ticker_class.side_effect = make_ticker
+        started = time.monotonic()
+        quotes, stale = await marketdata.aget_quotes(["A", "B", "C", "D", "SLOW"], timeout=1)
+
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(sorted(quotes), ["A", "B", "C", "D"])
+        self.assertEqual(stale, ["SLOW"])
+
+    def test_breaker_opens_on_failure_rate_and_recovers_after_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(window=4, failure_rate=0.5, min_calls=4, reset_timeout=30, clock=lambda: now[0])
+
+        def fail():
+            raise MarketDataError("down")
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)  # too few calls to judge
+
+        with self.assertRaises(MarketDataError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        vendor = MagicMock()
+        with self.assertRaises(VendorUnavailable):
+            breaker.call(vendor)
+        vendor.assert_not_called()
+
+        now[0] = 31
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # only one trial at a time
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_slow_calls_count_as_failures(self):
+        now = [0.0]
+        breaker = CircuitBreaker(window=2, failure_rate=1, min_calls=2, clock=lambda: now[0])
+
+        def slow():
+            now[0] += 5
+            return 1
+
+        self.assertEqual(breaker.call(slow, slow_after=3), 1)
+        self.assertEqual(breaker.call(slow, slow_after=3), 1)
+        self.assertTrue(breaker.is_open)
+
+    @patch("trading.marketdata.yahoo.yf.download")
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    def test_open_breaker_serves_stored_prices_without_calling_vendor(self, mock_ticker_class, mock_download):
+        marketdata.reset()
+        cache.clear()
+        self.addCleanup(marketdata.reset)
+        for _ in range(settings.MARKET_DATA_BREAKER_MIN_CALLS):
+            marketdata.breaker.record_failure()
+        Instrument.objects.create(symbol="AAA", name="Triple A", current_price=Decimal("12.50"))
+        self.client.force_login(User.objects.create_user("trader"))
+
+        started = time.monotonic()
+        listing = self.client.get(reverse("instrument_list"))
+        detail = self.client.get(reverse("instrument_detail", args=["AAA"]))
+
+        self.assertLess(time.monotonic() - started, 1)
+        mock_ticker_class.assert_not_called()
+        mock_download.assert_not_called()
+        self.assertContains(listing, "Offline: last known prices")
+        self.assertContains(listing, "12.50")
+        self.assertContains(detail, "$12.50")
+        self.assertContains(detail, "Market data is offline")
+
+    def test_local_provider_is_deterministic(self):
+        provider = LocalProvider()
+        first = provider.get_history("AAPL", period="1mo")
+        second = provider.get_history("AAPL", period="1mo")
+
+        self.assertFalse(first.empty)
+        self.assertEqual(first["Close"].tolist(), second["Close"].tolist())
+        self.assertEqual(provider.get_quote("AAPL").price, float(first["Close"].iloc[-1]))
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        marketdata.reset()
+        cache.clear()
+        metrics.registry.clear()
+        Instrument.objects.create(symbol="AAA", name="Triple A", current_price=Decimal("10.00"))
+
+    @patch("trading.marketdata.yahoo.yf.Ticker")
+    def test_requests_report_server_timing_and_per_view_metrics(self, mock_ticker_class):
+        dates = pd.date_range(end=dt.datetime.now(), periods=2)
+        mock_ticker_class.return_value.history.return_value = pd.DataFrame({"Close": [10.0, 11.0]}, index=dates)
+
+        first = self.client.get(reverse("instrument_list"))
+        marketdata.quote_cache.clear()  # the history expires, but the page itself stays cached
+        second = self.client.get(reverse("instrument_list"))
+
+        self.assertRegex(first["Server-Timing"], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('desc="1 calls"', first["Server-Timing"])
+        self.assertIn('cache;desc="0/1 hits"', first["Server-Timing"])
+        self.assertIn('desc="0 calls"', second["Server-Timing"])
+        self.assertEqual(mock_ticker_class.call_count, 1)
+
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('paper_trader_request_duration_seconds_count{view="instrument_list"} 2', body)
+        self.assertIn('paper_trader_request_duration_seconds_bucket{view="instrument_list",le="+Inf"} 2', body)
+        self.assertIn('paper_trader_market_data_calls_total{view="instrument_list"} 1', body)
+        self.assertIn('paper_trader_cache_misses_total{view="instrument_list"} 1', body)
+
+
+class BenchmarkTests(TestCase):
+    ARGS = ["--instruments", "4", "--holdings", "2", "--transactions", "10", "--snapshots", "10",
+            "--iterations", "2", "--orders", "3", "--latency", "0"]
+
+    def test_benchmark_writes_results_and_leaves_no_data(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command("benchmark", *self.ARGS, "--output", output.name, stdout=StringIO())
+            results = json.loads(Path(output.name).read_text())
+
+        self.assertEqual(
+            sorted(results["views"]),
+            sorted(f"{view}:{mode}" for view in ["instrument_list", "instrument_detail", "portfolio",
+                                                   "portfolio_analytics_api", "history_api"]
+                   for mode in ["cold", "warm"]),
+        )
+        self.assertGreater(results["views"]["portfolio:cold"]["queries"], 0)
+        self.assertGreater(results["trading"]["buy"]["ops_per_sec"], 0)
+        self.assertFalse(Instrument.objects.exists())
+
+    def test_benchmark_fails_on_regression(self):
+        with tempfile.NamedTemporaryFile("w+", suffix=".json") as baseline:
+            call_command("benchmark", *self.ARGS, "--output", baseline.name, stdout=StringIO())
+            results = json.loads(Path(baseline.name).read_text())
+            results["views"]["portfolio:warm"]["queries"] -= 1
+            baseline.seek(0)
+            baseline.truncate()
+            json.dump(results, baseline)
+            baseline.flush()
+
+            with self.assertRaisesMessage(CommandError, "regressions"):
+                call_command("benchmark", *self.ARGS, "--compare", baseline.name, "--threshold", "100",
+                             stdout=StringIO(), stderr=StringIO())
+
+
+class ExportImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("trader")
+        self.portfolio = self.user.portfolio
+        self.instrument = Instrument.objects.create(symbol="TEST", name="Test", current_price=Decimal("10.00"))
+        service = OrderService(self.portfolio)
+        service.buy(self.instrument, 3, Decimal("10.00"))
+        service.sell(self.instrument, 1, Decimal("12.00"))
+
+    async def test_csv_export_streams_current_epoch_in_chunks(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with override_settings(EXPORT_CHUNK_SIZE=1):
+            response = await client.get(reverse("export_data", args=["transactions", "csv"]))
+            chunks = [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertEqual(len(chunks), 2)  # one per row; the header goes with the first
+        lines = b"".join(chunks).decode().splitlines()
+        self.assertEqual(lines[0], "timestamp,symbol,type,quantity,price,epoch")
+        self.assertEqual([line.split(",")[2] for line in lines[1:]], ["BUY", "SELL"])
+
+    def test_unknown_export_is_404(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("export_data", args=["holdings", "csv"])).status_code, 404)
+
+    def test_import_round_trip_rebuilds_holdings(self):
+        other = User.objects.create_user("other")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "transactions.csv"
+            call_command("export_data", "transactions", "--user", "trader", "--output", str(path), stdout=StringIO())
+            with path.open("a") as f:
+                f.write("2024-01-02T10:00:00,NEWCO,BUY,5,2.50,0\n")
+            out = StringIO()
+            call_command("import_transactions", str(path), "--user", "other", "--batch-size", "2", stdout=out)
+
+        self.assertIn("Imported 3 transactions", out.getvalue())
+        portfolio = Portfolio.objects.get(user=other)
+        holdings = {h.instrument.symbol: h for h in Holding.objects.filter(portfolio=portfolio)}
+        self.assertEqual(holdings["TEST"].quantity, Decimal("2"))
+        self.assertEqual(holdings["TEST"].total_cost, Decimal("20.00"))
+        self.assertEqual(holdings["NEWCO"].quantity, Decimal("5"))
+        self.assertEqual(portfolio.realized_pnl, Decimal("2.00"))
+        self.assertEqual(portfolio.cash_balance, Decimal("10000") - 30 + 12 - Decimal("12.50"))
+        imported = Transaction.objects.filter(portfolio=portfolio, instrument__symbol="NEWCO").get()
+        self.assertEqual(imported.timestamp, dt.datetime(2024, 1, 2, 10, tzinfo=dt.timezone.utc))
+
+    def test_import_rejects_bad_rows_without_writing(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            f.write("timestamp,symbol,type,quantity,price\n2024-01-02T10:00:00,TEST,BUY,1,10\n2024-01-02,TEST,HOLD,1,10\n")
+            f.flush()
+            with self.assertRaisesMessage(CommandError, "Line 3"):
+                call_command("import_transactions", f.name, "--user", "trader", "--batch-size", "1", stdout=StringIO())
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    @skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet_export_round_trips(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "transactions.parquet"
+            call_command("export_data", "transactions", "--format", "parquet", "--output", str(path),
+                         "--chunk-size", "1", stdout=StringIO())
+            call_command("import_transactions", str(path), stdout=StringIO())
+
+        self.portfolio.refresh_from_db()
+        self.assertEqual(Transaction.objects.filter(portfolio=self.portfolio).count(), 4)
+        self.assertEqual(Holding.objects.get(portfolio=self.portfolio).quantity, Decimal("4"))
+
+
+class InstrumentSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_loads_listing_in_bulk_and_renames(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            listing = Path(tmp) / "listing.csv"
+            listing.write_text("Symbol,Name,Price\n" + "".join(f"S{i:04d},Company {i},{i}.5\n" for i in range(2000)))
+            with CaptureQueriesContext(connection) as captured:
+                call_command("seed_instruments", str(listing), stdout=StringIO())
+            self.assertLess(len(captured), 20)
+            self.assertEqual(Instrument.objects.count(), 2000)
+            self.assertEqual(Instrument.objects.get(symbol="S0007").current_price, Decimal("7.50"))
+
+            renames = Path(tmp) / "renames.json"
+            renames.write_text(json.dumps([{"symbol": "s0007", "name": "Renamed"}, {"symbol": "NEW", "name": "New"}]))
+            out = StringIO()
+            call_command("seed_instruments", str(renames), stdout=out)
+
+        self.assertIn("Added 1 instruments, renamed 1", out.getvalue())
+        self.assertEqual(Instrument.objects.get(symbol="S0007").name, "Renamed")
+        self.assertEqual(self.client.get(reverse("instrument_search"), {"q": "renam"}).json()["results"],
+                         [{"symbol": "S0007", "name": "Renamed"}])
+
+    def test_symbol_matches_rank_before_name_matches(self):
+        index = search.SymbolIndex([
+            ("AAPL", "Apple Inc."), ("APLE", "Apple Hospitality REIT"), ("AA", "Alcoa"), ("MSFT", "Microsoft"),
+        ])
+        self.assertEqual([r["symbol"] for r in index.search("aa")], ["AA", "AAPL"])
+        self.assertEqual([r["symbol"] for r in index.search("apple i")], ["AAPL"])
+        self.assertEqual([r["symbol"] for r in index.search("hosp")], ["APLE"])
+        self.assertEqual([r["symbol"] for r in index.search("a", limit=2)], ["AA", "AAPL"])
+        self.assertEqual(index.search("  "), [])
+
+    def test_index_rebuilds_only_when_the_universe_changes(self):
+        inst = Instrument.objects.create(symbol="TEST", name="Test Corp", current_price=Decimal("1"))
+        url = reverse("instrument_search")
+        self.assertEqual(self.client.get(url, {"q": "corp"}).json()["results"][0]["symbol"], "TEST")
+        index = search.get_index()
+
+        inst.current_price = Decimal("2")
+        inst.save(update_fields=["current_price"])
+        self.assertIs(search.get_index(), index)
+
+        Instrument.objects.create(symbol="TESX", name="Other", current_price=Decimal("1"))
+        self.assertEqual([r["symbol"] for r in self.client.get(url, {"q": "tes"}).json()["results"]], ["TEST", "TESX"])
+        self.assertEqual(self.client.get(url, {"q": "tes", "limit": "x"}).status_code, 400)
+
+
+class AnalyticsTests(TestCase):
+    def test_performance_metrics_are_vectorised_per_column(self):
+        values = pd.DataFrame(
+            {1: [100.0, 110.0, 99.0, 121.0], 2: [50.0, 50.0, 50.0, 50.0]},
+            index=pd.date_range("2025-01-01", periods=4),
+        )
+
+        metrics = performance(values)
+
+        self.assertAlmostEqual(metrics.loc[1, "time_weighted_return"], 0.21)
+        self.assertAlmostEqual(metrics.loc[1, "max_drawdown"], -0.1)
+        self.assertEqual(metrics.loc[2, "time_weighted_return"], 0)
+        self.assertTrue(pd.isna(metrics.loc[2, "sharpe"]))
+
+    def test_portfolio_analytics_api(self):
+        user = User.objects.create_user("trader")
+        self.client.force_login(user)
+        portfolio = user.portfolio
+        for value in ["10000", "10500", "10200"]:
+            PortfolioSnapshot.objects.create(portfolio=portfolio, total_value=Decimal(value))
+
+        data = self.client.get(reverse("portfolio_analytics_api")).json()
+
+        self.assertEqual(data["values"], [10200.0])  # one snapshot per day; the last one wins
+        self.assertEqual(data["metrics"]["time_weighted_return"], 0)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.portfolio = User.objects.create_user("trader").portfolio
+        instrument = Instrument.objects.create(symbol="TEST", name="Test Instrument", current_price=Decimal("50"))
+        Holding.objects.create(portfolio=self.portfolio, instrument=instrument, quantity=2)
+
+    def test_take_snapshots_values_portfolios_once_per_bucket(self):
+        now = dt.datetime(2025, 3, 4, 15, 7, tzinfo=dt.timezone.utc)
+
+        take_snapshots(300, now=now)
+        take_snapshots(300, now=now + dt.timedelta(minutes=2))
+
+        snapshot = PortfolioSnapshot.objects.get()
+        self.assertEqual(snapshot.total_value, Decimal("10100.00"))
+        self.assertEqual(snapshot.timestamp, dt.datetime(2025, 3, 4, 15, 5, tzinfo=dt.timezone.utc))
+        self.assertEqual(snapshot.granularity, PortfolioSnapshot.INTRADAY)
+
+    def test_compaction_keeps_last_snapshot_per_day(self):
+        start = dt.datetime(2025, 3, 4, 14, 0, tzinfo=dt.timezone.utc)
+        for i in range(3):
+            take_snapshots(300, now=start + dt.timedelta(minutes=5 * i))
+        take_snapshots(300, now=start + dt.timedelta(days=1))
+
+        deleted = compact_snapshots(before=dt.date(2025, 3, 5))
+
+        self.assertEqual(deleted, 2)
+        daily = PortfolioSnapshot.objects.get(date=dt.date(2025, 3, 4))
+        self.assertEqual(daily.granularity, PortfolioSnapshot.DAILY)
+        self.assertEqual(daily.timestamp, start + dt.timedelta(minutes=10))
+        self.assertEqual(
+            PortfolioSnapshot.objects.get(date=dt.date(2025, 3, 5)).granularity,
+            PortfolioSnapshot.INTRADAY,
+        )
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        expensive = Instrument.objects.create(symbol="HIGH", name="High", current_price=Decimal("100"))
+        cheap = Instrument.objects.create(symbol="LOW", name="Low", current_price=Decimal("5"))
+        self.portfolios = {}
+        for name, cash, holdings in [
+            ("alice", "9000", [(expensive, 20), (cheap, 10)]),  # 9000 + 2000 + 50
+            ("bob", "10000", []),
+            ("carol", "5000", [(cheap, 100)]),  # 5000 + 500
+        ]:
+            portfolio = User.objects.create_user(name).portfolio
+            portfolio.cash_balance = Decimal(cash)
+            portfolio.save(update_fields=["cash_balance"])
+            for inst, quantity in holdings:
+                Holding.objects.create(portfolio=portfolio, instrument=inst, quantity=quantity)
+            self.portfolios[name] = portfolio
+
+    def test_portfolios_are_valued_in_one_query(self):
+        with CaptureQueriesContext(connection) as captured:
+            values = {p.user.username: p.total_value for p in valued_portfolios().select_related("user")}
+        self.assertEqual(len(captured), 1)
+        self.assertEqual(values, {"alice": Decimal("11050"), "bob": Decimal("10000"), "carol": Decimal("5500")})
+
+    def test_refresh_ranks_and_pages_the_leaderboard(self):
+        self.assertEqual(refresh_leaderboard(batch_size=2), 3)
+        self.assertEqual(
+            list(PortfolioValuation.objects.order_by("rank").values_list("portfolio__user__username", "return_percent")),
+            [("alice", Decimal("10.50")), ("bob", Decimal("0.00")), ("carol", Decimal("-45.00"))],
+        )
+
+        with override_settings(LEADERBOARD_PAGE_SIZE=2):
+            first = self.client.get(reverse("leaderboard_api")).json()
+            with CaptureQueriesContext(connection) as captured:
+                second = self.client.get(reverse("leaderboard_api"), {"page": 2}).json()
+        self.assertEqual([r["username"] for r in first["results"]], ["alice", "bob"])
+        self.assertEqual(first["next_page"], 2)
+        self.assertEqual(second["results"], [{"rank": 3, "username": "carol", "total_value": "5500.00", "return_percent": "-45.00"}])
+        self.assertIsNone(second["next_page"])
+        self.assertEqual(len(captured), 1)
+
+        self.client.force_login(self.portfolios["carol"].user)
+        response = self.client.get(reverse("leaderboard"))
+        self.assertContains(response, "#3 — $5500.00")
@@ -6,7 +6,19 @@ urlpatterns = [
     path('instrument/<str:symbol>/', views.instrument_detail, name='instrument_detail'),
     path('instruments/', views.instrument_list, name='instrument_list'),
     path('portfolio/', views.portfolio_view, name='portfolio'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
     path('reset/', views.reset_portfolio, name='reset_portfolio'),
+    path('signup/', views.signup, name='signup'),
     path('instrument/<str:symbol>/sell/', views.sell_instrument, name='sell_instrument'),
+    path('instrument/<str:symbol>/order/', views.place_order, name='place_order'),
+    path('orders/<int:pk>/cancel/', views.cancel_order, name='cancel_order'),
     path('instruments/history/', views.instrument_history_view, name='instrument_history'),
+    path('api/instruments/search/', views.instrument_search, name='instrument_search'),
+    path('api/history/', views.history_api, name='history_api'),
+    path('api/prices/stream/', views.price_stream, name='price_stream'),
+    path('api/orders/basket/', views.basket_api, name='basket_api'),
+    path('api/portfolio/analytics/', views.portfolio_analytics_api, name='portfolio_analytics_api'),
+    path('api/leaderboard/', views.leaderboard_api, name='leaderboard_api'),
+    path('export/<str:kind>.<str:fmt>', views.export_data, name='export_data'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
 ]
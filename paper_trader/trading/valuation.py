@@ -0,0 +1,94 @@
+"""Portfolio values computed in the database, and the leaderboard built from them.
+
+Values use the stored ``Instrument.current_price``, kept fresh by
+``refresh_prices`` (or by page views), rather than live quotes. That makes
+every portfolio's value a single aggregate query, however many there are.
+Ranking them on every page view would still sort them all each time, so
+``refresh_leaderboard`` writes the ranking to ``PortfolioValuation`` on a
+schedule. The leaderboard then reads one page of rows by rank.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Holding, Portfolio, PortfolioValuation
+from .orders import STARTING_CASH
+
+VALUE_FIELD = DecimalField(max_digits=24, decimal_places=6)
+HUNDRED = Decimal("100")
+
+
+def holdings_values():
+    """``{portfolio_id: market value}`` for every portfolio, in one aggregate query."""
+    value = ExpressionWrapper(F("quantity") * F("instrument__current_price"), output_field=VALUE_FIELD)
+    rows = Holding.objects.values("portfolio_id").annotate(value=Sum(value)).values_list("portfolio_id", "value")
+    return dict(rows)
+
+
+def valued_portfolios():
+    """Portfolios annotated with ``holdings_value`` and ``total_value``, grouped in the database."""
+    holdings_value = Sum(
+        ExpressionWrapper(F("holdings__quantity") * F("holdings__instrument__current_price"), output_field=VALUE_FIELD)
+    )
+    return Portfolio.objects.annotate(
+        holdings_value=Coalesce(holdings_value, Value(Decimal("0")), output_field=VALUE_FIELD),
+    ).annotate(
+        total_value=ExpressionWrapper(F("cash_balance") + F("holdings_value"), output_field=VALUE_FIELD),
+    )
+
+
+def refresh_leaderboard(batch_size=1000):
+    """Rank every portfolio by total value and replace the leaderboard rows.
+
+    Valuing and sorting happen in one query. The rows stream out in rank
+    order and are written in batches, and readers keep seeing the old
+    ranking until the new one is committed. Every portfolio starts from the
+    same cash, so ranking by value is also ranking by return. Returns the
+    number of portfolios ranked.
+    """
+    now = timezone.now()
+    rows = (
+        valued_portfolios()
+        .order_by("-total_value", "pk")
+        .values_list("pk", "cash_balance", "holdings_value", "total_value")
+    )
+
+    ranked = 0
+    pending = []
+    with transaction.atomic():
+        PortfolioValuation.objects.all().delete()
+        for portfolio_id, cash, holdings_value, total_value in rows.iterator(chunk_size=batch_size):
+            ranked += 1
+            total_value = round(total_value, 2)
+            pending.append(PortfolioValuation(
+                portfolio_id=portfolio_id,
+                rank=ranked,
+                cash_balance=cash,
+                holdings_value=round(holdings_value, 2),
+                total_value=total_value,
+                return_percent=round((total_value - STARTING_CASH) / STARTING_CASH * HUNDRED, 2),
+                updated_at=now,
+            ))
+            if len(pending) >= batch_size:
+                PortfolioValuation.objects.bulk_create(pending)
+                pending = []
+        PortfolioValuation.objects.bulk_create(pending)
+    return ranked
+
+
+def leaderboard_page(page, size):
+    """Rows ranked ``(page - 1) * size + 1`` onwards, and whether there are more.
+
+    Ranks are stored, so any page is a range read on the rank index.
+    """
+    first = (page - 1) * size
+    rows = list(
+        PortfolioValuation.objects.filter(rank__gt=first, rank__lte=first + size + 1)
+        .select_related("portfolio__user")
+        .order_by("rank")
+    )
+    return rows[:size], len(rows) > size
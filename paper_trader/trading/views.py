@@ -1,23 +1,71 @@
-from .models import Portfolio, Holding, Transaction, Instrument, PortfolioSnapshot
-from datetime import date
-from decimal import Decimal
+from .models import Portfolio, PortfolioValuation, Holding, Transaction, Instrument, Order
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+import hashlib
 import json
-from django.shortcuts import render, get_object_or_404, redirect
+from django.db.models import Q
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.contrib import messages
-from .forms import BuyForm
-import yfinance as yf
-from curl_cffi.requests.errors import CurlError
-from requests.exceptions import RequestException
-from django.http import JsonResponse
+from django.contrib.auth import login
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.forms import UserCreationForm
+from .forms import BuyForm, OrderForm
+from . import exports, marketdata, metrics, pagecache, search
+from .marketdata import MarketDataError
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST
+from django.utils import timezone
+from django.conf import settings
+from .pricing import apply_closes
+from .bars import async_sync_bars, close_matrix, close_series
+from .orders import BasketOrder, OrderService
+from .analytics import portfolio_analytics
+from .valuation import leaderboard_page
+from .streaming import price_events
+
+def _portfolio(request):
+    """The logged-in user's portfolio, created on first use."""
+    portfolio, _ = Portfolio.objects.get_or_create(user=request.user)
+    return portfolio
+
+
+async def _auser(request):
+    """Load the user without blocking, so templates can read ``request.user``."""
+    request.user = await request.auser()
+    return request.user
+
+
+async def _aportfolio(request):
+    portfolio, _ = await Portfolio.objects.aget_or_create(user=await _auser(request))
+    return portfolio
+
+
+def signup(request):
+    if request.method == "POST":
+        form = UserCreationForm(request.POST)
+        if form.is_valid():
+            user = form.save()
+            login(request, user)
+            messages.success(request, f"Welcome, {user.username}! Your portfolio is ready.")
+            return redirect("portfolio")
+    else:
+        form = UserCreationForm()
+    return render(request, "trading/signup.html", {"form": form})
 
-def sell_instrument(request, symbol):
-    instrument = get_object_or_404(Instrument, symbol=symbol)
-    portfolio = Portfolio.objects.first()
+
+@login_required
+async def sell_instrument(request, symbol):
+    instrument = await aget_object_or_404(Instrument, symbol=symbol)
+    portfolio = await _aportfolio(request)
 
     try:
-        ticker = yf.Ticker(symbol)
-        latest_price = ticker.info.get("regularMarketPrice")
-    except (CurlError, RequestException):
+        latest_price = (await marketdata.aget_quote(symbol)).price
+    except MarketDataError:
         messages.error(request, f"Unable to fetch latest price for {symbol}. Are you offline?")
         return redirect("portfolio")
 
@@ -27,97 +75,109 @@ def sell_instrument(request, symbol):
 
     price = Decimal(str(latest_price))
     instrument.current_price = price
-    instrument.save(update_fields=["current_price"])
+    await instrument.asave(update_fields=["current_price"])
 
     if request.method == "POST":
         quantity = int(request.POST.get("quantity", 0))
 
-        if quantity <= 0:
-            messages.error(request, "Invalid quantity entered.")
-            return redirect("portfolio")
-
-        holding = Holding.objects.filter(portfolio=portfolio, instrument=instrument).first()
-        if not holding:
-            messages.error(request, f"You don’t own any shares of {instrument.symbol}.")
-            return redirect("portfolio")
-
-        if quantity > holding.quantity:
-            messages.error(request, "You don’t own that many shares")
-            return redirect("portfolio")
-
-
-        # Process valid sale
-        total_value = price * quantity
-        portfolio.cash_balance += total_value
-        portfolio.save()
-
-        holding.quantity -= quantity
-        if holding.quantity == 0:
-            holding.delete()
+        result = await sync_to_async(OrderService(portfolio).sell)(instrument, quantity, price)
+        if result.success:
+            messages.success(request, result.message)
         else:
-            holding.save()
-
-        Transaction.objects.create(
-            instrument=instrument,
-            portfolio=portfolio,
-            type="SELL",
-            quantity=quantity,
-            price=price,
-        )
-
-        messages.success(request, f"Successfully sold {quantity} shares of {instrument.symbol} at ${price:.2f}")
+            messages.error(request, result.message)
         return redirect("portfolio")
 
     return render(request, "trading/sell_instrument.html", {"instrument": instrument, "price": price})
 
 
-def instrument_list(request):
-    instruments_data = []
+async def _refresh_list_prices(request):
+    """Pull the latest closes for every instrument; returns them, ready to list."""
+    instruments = [inst async for inst in Instrument.objects.all().order_by("symbol")]
+    histories = await marketdata.aget_histories([inst.symbol for inst in instruments], period="5d")
+    if marketdata.offline():
+        # The breaker tripped during this fetch: one notice, not one per symbol
+        messages.warning(request, "Market data is offline; showing last known prices.")
+    else:
+        for inst in instruments:
+            if inst.symbol not in histories:
+                messages.error(request, f"Could not fetch data for {inst.symbol}")
+
+    # One UPDATE for every changed price instead of a save() per row
+    updated = apply_closes(instruments, histories)
+    if updated:
+        await Instrument.objects.abulk_update(updated, ["current_price", "previous_close", "price_updated_at"])
+        await pagecache.abump(inst.symbol for inst in updated)
+    return instruments
+
+
+async def instrument_list(request):
+    await _auser(request)
+    instruments = None
+
+    # The vendor is asked at most once per quote TTL; in between the page is served from the cache.
+    # While the vendor is down the stored prices are shown as they are.
+    if (
+        not settings.MARKET_DATA_USE_STORED_PRICES
+        and not marketdata.offline()
+        and await pagecache.refresh_due("instrument_list", settings.MARKET_DATA_QUOTE_TTL)
+    ):
+        instruments = await _refresh_list_prices(request)
+
+    async def render_list():
+        rows = instruments
+        if rows is None:
+            rows = [inst async for inst in Instrument.objects.all().order_by("symbol")]
+        instruments_data = []
+        for inst in rows:
+            has_price = inst.price_updated_at is not None or bool(inst.current_price)
+            instruments_data.append({
+                "name": inst.name,
+                "symbol": inst.symbol,
+                "price": inst.current_price if has_price else "N/A",
+                "previous_close": inst.previous_close if has_price and inst.previous_close is not None else "N/A",
+            })
+        return render(request, "trading/instrument_list.html", {"instruments": instruments_data})
 
-    for inst in Instrument.objects.all().order_by("symbol"):
-        latest = None
-        prev = None
-        try:
-            ticker = yf.Ticker(inst.symbol)
-            hist = ticker.history(period="5d")
-
-            if not hist.empty and len(hist["Close"]) >= 2:
-                latest = round(float(hist["Close"].iloc[-1]), 2)
-                prev = round(float(hist["Close"].iloc[-2]), 2)
-                inst.current_price = Decimal(str(latest))
-                inst.save(update_fields=["current_price"])
-        except (CurlError, RequestException):
-            messages.error(request, f"Could not fetch data for {inst.symbol}")
-
-        instruments_data.append({
-            "name": inst.name,
-            "symbol": inst.symbol,
-            "price": latest if latest is not None else "N/A",
-            "previous_close": prev if prev is not None else "N/A",
+    return await pagecache.cached_page(request, "instrument_list", [pagecache.ALL], render_list)
+
+
+def _price_chart(instrument):
+    """The chart script with the last 30 days of closes, cached until the symbol's bars or price change."""
+    def render_chart():
+        dates, close_prices = close_series([instrument]).get(instrument.symbol, ([], []))
+        return render_to_string("trading/_price_chart.html", {
+            "dates_json": json.dumps(dates),
+            "close_prices_json": json.dumps(close_prices),
         })
+    return mark_safe(pagecache.fragment(f"chart:{instrument.symbol}", [instrument.symbol], render_chart))
 
-    return render(request, "trading/instrument_list.html", {"instruments": instruments_data})
+@login_required
+async def instrument_detail(request, symbol):
+    instrument = await aget_object_or_404(Instrument, symbol=symbol)
 
-def instrument_detail(request, symbol):
-    instrument = get_object_or_404(Instrument, symbol=symbol)
+    if (
+        not settings.MARKET_DATA_USE_STORED_PRICES
+        and not marketdata.offline()
+        and await pagecache.refresh_due(f"bars:{symbol}", settings.MARKET_DATA_QUOTE_TTL)
+    ):
+        await async_sync_bars([instrument])
 
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="1mo")
-        dates = hist.index.strftime('%Y-%m-%d').tolist()
-        close_prices = hist['Close'].round(2).tolist()
-        latest_price = ticker.info.get('regularMarketPrice')
-        previous_close = ticker.info.get('previousClose', 'N/A')
-    except (CurlError, RequestException):
-        messages.error(request, f"Unable to load data for {symbol}. Check your internet connection.")
-        dates = []
-        close_prices = []
+        quote = await marketdata.aget_quote(symbol)
+        latest_price = quote.price
+        previous_close = quote.previous_close if quote.previous_close is not None else 'N/A'
+    except MarketDataError:
+        if marketdata.offline():
+            messages.warning(request, f"Market data is offline; showing the last known price for {symbol}.")
+        else:
+            messages.error(request, f"Unable to load data for {symbol}. Check your internet connection.")
+        # Shown for reference only: buying still needs a live price
         latest_price = None
-        previous_close = "N/A"
+        previous_close = instrument.previous_close if instrument.previous_close is not None else "N/A"
 
-    portfolio = Portfolio.objects.first()
+    portfolio = await _aportfolio(request)
 
-    latest_price_value = latest_price if latest_price is not None else 'N/A'
+    latest_price_value = latest_price if latest_price is not None else (instrument.current_price or 'N/A')
 
     if request.method == 'POST':
         form = BuyForm(request.POST)
@@ -127,91 +187,161 @@ def instrument_detail(request, symbol):
                 messages.error(request, "Unable to fetch latest price.")
             else:
                 price = Decimal(str(latest_price))
-                total_cost = quantity * price
-
-                if portfolio.cash_balance >= total_cost:
-                    portfolio.cash_balance -= total_cost
-                    portfolio.save()
-
-                    holding, created = Holding.objects.get_or_create(
-                        instrument=instrument,
-                        portfolio=portfolio,
-                        defaults={'quantity': quantity}
-                    )
-                    if not created:
-                        holding.quantity += quantity
-                        holding.save()
-
-                    Transaction.objects.create(
-                        instrument=instrument,
-                        portfolio=portfolio,
-                        type='BUY',
-                        quantity=quantity,
-                        price=price
-                    )
+                result = await sync_to_async(OrderService(portfolio).buy)(instrument, quantity, price)
 
+                if result.success:
                     instrument.current_price = price
-                    instrument.save(update_fields=["current_price"])
-
-                    messages.success(
-                        request,
-                        f"Bought {quantity} shares of {instrument.symbol} at ${price:.2f} each (Total: ${total_cost:.2f})"
-                    )
+                    await instrument.asave(update_fields=["current_price"])
+                    messages.success(request, result.message)
                 else:
-                    messages.error(request, "Insufficient cash to complete purchase.")
+                    messages.error(request, result.message)
         else:
             messages.error(request, "Invalid quantity entered.")    
     else:
         form = BuyForm()
 
-    context = {
-        'instrument': instrument,
-        'dates_json': json.dumps(dates),
-        'close_prices_json': json.dumps(close_prices),
-        'latest_price': latest_price_value,
-        'previous_close': previous_close,
-        'form': form,
-        'portfolio': portfolio,
-        'message': "",
-        'success': False
-    }
-
-    return render(request, 'trading/instrument_detail.html', context)
-
-def portfolio_view(request):
-    portfolio = Portfolio.objects.first()
-    holdings = Holding.objects.filter(portfolio=portfolio)
-    transactions = Transaction.objects.filter(portfolio=portfolio).order_by("-timestamp")
+    async def render_detail():
+        context = {
+            'instrument': instrument,
+            'chart': await sync_to_async(_price_chart)(instrument),
+            'latest_price': latest_price_value,
+            'previous_close': previous_close,
+            'form': form,
+            'order_form': OrderForm(),
+            'portfolio': portfolio,
+            'message': "",
+            'success': False
+        }
+        return render(request, 'trading/instrument_detail.html', context)
+
+    return await pagecache.cached_page(
+        request, "instrument_detail", [symbol], render_detail,
+        extra=(latest_price_value, previous_close, portfolio.cash_balance),
+    )
+
+
+@login_required
+@require_POST
+def place_order(request, symbol):
+    instrument = get_object_or_404(Instrument, symbol=symbol)
+    form = OrderForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, "Invalid order: check the quantity and price.")
+        return redirect("instrument_detail", symbol=symbol)
+
+    order = Order.objects.create(portfolio=_portfolio(request), instrument=instrument, **form.cleaned_data)
+    messages.success(
+        request,
+        f"Placed {order.kind.lower()} order to {order.side.lower()} {order.quantity.normalize()} "
+        f"{symbol} at ${order.trigger_price:.2f}",
+    )
+    return redirect("portfolio")
+
+
+@login_required
+@require_POST
+def cancel_order(request, pk):
+    cancelled = Order.objects.filter(pk=pk, portfolio=_portfolio(request), status=Order.OPEN).update(
+        status=Order.CANCELLED, message="Cancelled by user.", closed_at=timezone.now()
+    )
+    if cancelled:
+        messages.success(request, "Order cancelled.")
+    else:
+        messages.error(request, "That order is no longer open.")
+    return redirect("portfolio")
+
+TRANSACTIONS_PER_PAGE = 50
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+async def _transaction_page(portfolio, cursor):
+    """One page of transactions, newest first, using a (timestamp, id) keyset.
+
+    ``cursor`` is the ``next_cursor`` of the previous page; seeking from it
+    uses the (portfolio, epoch, timestamp) index, so deep pages cost the same as
+    the first one.
+    """
+    transactions = (
+        Transaction.objects.filter(portfolio=portfolio, epoch=portfolio.epoch)
+        .select_related("instrument")
+        .order_by("-timestamp", "-id")
+    )
+    if cursor:
+        try:
+            micros, pk = (int(part) for part in cursor.split("-"))
+        except ValueError:
+            micros, pk = None, None
+        if micros is not None:
+            ts = EPOCH + timedelta(microseconds=micros)
+            transactions = transactions.filter(Q(timestamp__lt=ts) | Q(timestamp=ts, id__lt=pk))
+
+    page = [tx async for tx in transactions[:TRANSACTIONS_PER_PAGE + 1]]
+    if len(page) <= TRANSACTIONS_PER_PAGE:
+        return page, None
+
+    page = page[:TRANSACTIONS_PER_PAGE]
+    last = page[-1]
+    micros = (last.timestamp - EPOCH) // timedelta(microseconds=1)
+    return page, f"{micros}-{last.pk}"
+
+
+@login_required
+async def portfolio_view(request):
+    portfolio = await _aportfolio(request)
+    holdings = [h async for h in Holding.objects.filter(portfolio=portfolio).select_related("instrument")]
+    transactions, next_cursor = await _transaction_page(portfolio, request.GET.get("before"))
+    open_orders = [
+        order async for order in Order.objects.filter(portfolio=portfolio, status=Order.OPEN)
+        .select_related("instrument")
+        .order_by("-created_at")
+    ]
 
     total_holdings_value = Decimal("0.00")
 
-    for h in holdings:
-        try:
-            ticker = yf.Ticker(h.instrument.symbol)
-            latest_price = ticker.info.get("regularMarketPrice")
-        except (CurlError, RequestException):
-            messages.error(request, f"Unable to fetch price for {h.instrument.symbol}. Are you offline?")
-            latest_price = None
-
-        if latest_price is not None:
-            price = Decimal(str(latest_price))
-            h.instrument.current_price = price
-            h.instrument.save(update_fields=["current_price"])
-            total_holdings_value += h.quantity * price
+    # Fetch every holding's quote at once; latency is the slowest quote, not the sum
+    if settings.MARKET_DATA_USE_STORED_PRICES:
+        quotes, stale_symbols = {}, []
+    else:
+        quotes, stale_symbols = await marketdata.aget_quotes([h.instrument.symbol for h in holdings])
+    updated = []
 
-    total_value = portfolio.cash_balance + total_holdings_value
+    for h in holdings:
+        quote = quotes.get(h.instrument.symbol)
+        h.stale = h.instrument.symbol in stale_symbols
 
-    # Snapshot portfolio value
-    today = date.today()
-    if not PortfolioSnapshot.objects.filter(portfolio=portfolio, date=today).exists():
-        PortfolioSnapshot.objects.create(
-            portfolio=portfolio,
-            total_value=round(total_value, 2)
+        if quote is None or quote.price is None:
+            price = h.instrument.current_price
+        else:
+            price = Decimal(str(quote.price))
+            if h.instrument.current_price != price:
+                h.instrument.current_price = price
+                updated.append(h.instrument)
+        h.price = price
+        h.market_value = h.quantity * price
+        h.unrealized_pnl = h.market_value - h.total_cost
+        h.return_percent = (h.unrealized_pnl / h.total_cost * 100) if h.total_cost else None
+        total_holdings_value += h.market_value
+
+    if updated:
+        await Instrument.objects.abulk_update(updated, ["current_price"])
+        await pagecache.abump(inst.symbol for inst in updated)
+    if stale_symbols:
+        messages.warning(
+            request,
+            f"Live prices unavailable for {', '.join(stale_symbols)}; using last known prices.",
         )
 
-    snapshots = PortfolioSnapshot.objects.filter(portfolio=portfolio).order_by("date")
-    snapshot_dates = [snap.date.strftime('%Y-%m-%d') for snap in snapshots]
-    snapshot_values = [float(snap.total_value) for snap in snapshots]
+    total_value = portfolio.cash_balance + total_holdings_value
+
+    analytics = await sync_to_async(portfolio_analytics)(portfolio, holdings)
+    # Fractions from the analytics engine, shown as percentages (Sharpe is a ratio)
+    metrics = {
+        name: value * 100 if value is not None and name != "sharpe" else value
+        for name, value in analytics["metrics"].items()
+    }
+    for h in holdings:
+        contribution = analytics["contributions"].get(h.instrument.symbol)
+        h.contribution = contribution * 100 if contribution is not None else None
 
     # === NEW: Gain/loss percentage ===
     INITIAL_CASH = Decimal("10000.00")
@@ -221,47 +351,243 @@ def portfolio_view(request):
         "portfolio": portfolio,
         "holdings": holdings,
         "transactions": transactions,
-        "snapshot_dates": json.dumps(snapshot_dates),
-        "snapshot_values": json.dumps(snapshot_values),
+        "open_orders": open_orders,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get("before"),
+        "snapshot_dates": json.dumps(analytics["dates"]),
+        "snapshot_values": json.dumps(analytics["values"]),
+        "metrics": metrics,
         "total_value": round(total_value, 2),
+        "unrealized_pnl": round(total_holdings_value - portfolio.total_cost, 2),
         "gain_loss_percent": gain_loss_percent,  # Add to context
+        "stale_symbols": stale_symbols,
     }
     return render(request, "trading/portfolio.html", context)
 
+@login_required
+@require_GET
+def portfolio_analytics_api(request):
+    portfolio = _portfolio(request)
+    holdings = list(Holding.objects.filter(portfolio=portfolio).select_related("instrument"))
+    return JsonResponse(portfolio_analytics(portfolio, holdings))
+
+def _leaderboard_page(request):
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    rows, has_next = leaderboard_page(page, settings.LEADERBOARD_PAGE_SIZE)
+    return page, rows, has_next
+
+
+@require_GET
+def leaderboard(request):
+    """Portfolios ranked by total value, as of the last ``take_snapshots`` pass."""
+    page, rows, has_next = _leaderboard_page(request)
+    own = None
+    if request.user.is_authenticated:
+        own = PortfolioValuation.objects.filter(portfolio__user=request.user).first()
+    return render(request, "trading/leaderboard.html", {
+        "rows": rows,
+        "own": own,
+        "page": page,
+        "next_page": page + 1 if has_next else None,
+        "previous_page": page - 1 if page > 1 else None,
+        "updated_at": rows[0].updated_at if rows else None,
+    })
+
+
+@require_GET
+def leaderboard_api(request):
+    page, rows, has_next = _leaderboard_page(request)
+    return JsonResponse({
+        "page": page,
+        "next_page": page + 1 if has_next else None,
+        "updated_at": rows[0].updated_at.isoformat() if rows else None,
+        "results": [
+            {
+                "rank": row.rank,
+                "username": row.username,
+                "total_value": str(row.total_value),
+                "return_percent": str(row.return_percent),
+            }
+            for row in rows
+        ],
+    })
+
+
+@login_required
 def reset_portfolio(request):
     if request.method == "POST":
-        Holding.objects.all().delete()
-        Transaction.objects.all().delete()
-        PortfolioSnapshot.objects.all().delete()
-        portfolio = Portfolio.objects.first()
-        if portfolio:
-            portfolio.cash_balance = 10000
-            portfolio.save()
+        OrderService(_portfolio(request)).reset()
         messages.success(request, "Portfolio reset successfully.")
         return redirect("portfolio")
 
 
-def instrument_history_view(request):
-    instruments = Instrument.objects.all().order_by("symbol")
-    historical_data = []
+async def instrument_history_view(request):
+    # The charts load their data from history_api after the page renders
+    await _auser(request)
 
-    for inst in instruments:
-        try:
-            ticker = yf.Ticker(inst.symbol)
-            hist = ticker.history(period="1mo")  # Adjust period as needed
-            if hist.empty:
-                continue
-            dates = hist.index.strftime('%Y-%m-%d').tolist()
-            prices = hist['Close'].round(2).tolist()
-            historical_data.append({
-                "symbol": inst.symbol,
-                "dates": dates,
-                "prices": prices,
-            })
-        except (CurlError, RequestException):
-            continue
+    async def render_history():
+        return render(request, "trading/instrument_history.html")
 
-    context = {
-        "historical_data": json.dumps(historical_data),
+    return await pagecache.cached_page(request, "instrument_history", [pagecache.ALL], render_history)
+
+
+@gzip_page
+@require_GET
+async def history_api(request):
+    """Closing prices for ``?symbols=A,B&start=YYYY-MM-DD&end=YYYY-MM-DD``.
+
+    The response is columnar: one shared ``dates`` list and one price list
+    per symbol. Defaults to every instrument over the last 30 days.
+    """
+    try:
+        end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else date.today()
+        start = date.fromisoformat(request.GET["start"]) if request.GET.get("start") else end - timedelta(days=30)
+    except ValueError:
+        return JsonResponse({"error": "Dates must be YYYY-MM-DD."}, status=400)
+
+    instruments = Instrument.objects.order_by("symbol")
+    requested = [s.strip().upper() for s in request.GET.get("symbols", "").split(",") if s.strip()]
+    if requested:
+        instruments = instruments.filter(symbol__in=requested)
+    instruments = [inst async for inst in instruments]
+    symbols = [inst.symbol for inst in instruments]
+
+    # Bars for the whole universe are left to refresh_prices; named symbols
+    # share instrument_detail's per-symbol throttle, so overlapping requests
+    # download each symbol at most once per interval.
+    if requested and not settings.MARKET_DATA_USE_STORED_PRICES and not marketdata.offline():
+        due = [
+            inst for inst in instruments
+            if await pagecache.refresh_due(f"bars:{inst.symbol}", settings.MARKET_DATA_QUOTE_TTL)
+        ]
+        if due:
+            await async_sync_bars(due)
+
+    def render_body():
+        dates, series = close_matrix(instruments, start, end)
+        return json.dumps({"dates": dates, "series": series}, separators=(",", ":"))
+
+    body = await sync_to_async(pagecache.fragment)(
+        f"history:{start}:{end}:{','.join(symbols)}", symbols, render_body
+    )
+
+    etag = f'"{hashlib.md5(body.encode()).hexdigest()}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    return response
+
+
+@require_GET
+def instrument_search(request):
+    """Autocomplete for ``?q=``: instruments whose symbol, or a word of whose name, starts with it."""
+    try:
+        limit = min(int(request.GET.get("limit", 10)), settings.SEARCH_MAX_RESULTS)
+    except ValueError:
+        return JsonResponse({"error": "limit must be a number."}, status=400)
+    return JsonResponse({"results": search.search(request.GET.get("q", ""), max(limit, 0))})
+
+
+@login_required
+@require_GET
+async def price_stream(request):
+    """Server-sent price updates for ``?symbols=A,B`` from the shared poller.
+
+    Needs the ASGI entry point (``paper_trader.asgi``); every connection
+    shares one upstream fetch per symbol per interval. Only listed
+    instruments are streamed, so made-up symbols can't add vendor calls.
+    """
+    symbols = {s.strip().upper() for s in request.GET.get("symbols", "").split(",") if s.strip()}
+    if not symbols or len(symbols) > settings.PRICE_STREAM_MAX_SYMBOLS:
+        return JsonResponse(
+            {"error": f"Pass between 1 and {settings.PRICE_STREAM_MAX_SYMBOLS} symbols."}, status=400
+        )
+    symbols = sorted([
+        symbol async for symbol in Instrument.objects.filter(symbol__in=symbols).values_list("symbol", flat=True)
+    ])
+    if not symbols:
+        return JsonResponse({"error": "None of those symbols are listed instruments."}, status=400)
+
+    response = StreamingHttpResponse(price_events(symbols), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let nginx pass events through unbuffered
+    return response
+
+
+@login_required
+@require_POST
+async def basket_api(request):
+    """Execute ``{"orders": [{"symbol", "side", "quantity"}, ...]}`` in one go.
+
+    All symbols are priced with a single concurrent quote lookup and the
+    whole basket is accepted or rejected together.
+    """
+    try:
+        payload = json.loads(request.body)
+        orders = [
+            BasketOrder(
+                symbol=str(order["symbol"]).strip().upper(),
+                side=str(order["side"]).strip().upper(),
+                quantity=Decimal(str(order["quantity"])),
+            )
+            for order in payload["orders"]
+        ]
+    except (ValueError, KeyError, TypeError, InvalidOperation):
+        return JsonResponse(
+            {"errors": ['Body must be {"orders": [{"symbol": ..., "side": ..., "quantity": ...}]}.']},
+            status=400,
+        )
+
+    quotes, _ = await marketdata.aget_quotes({order.symbol for order in orders})
+    prices = {
+        symbol: Decimal(str(quote.price))
+        for symbol, quote in quotes.items()
+        if quote.price is not None
     }
-    return render(request, "trading/instrument_history.html", context)
\ No newline at end of file
+
+    portfolio = await _aportfolio(request)
+    result = await sync_to_async(OrderService(portfolio).submit_basket)(orders, prices)
+    if not result.success:
+        return JsonResponse({"errors": result.errors}, status=400)
+
+    return JsonResponse({
+        "cash_balance": str(portfolio.cash_balance),
+        "transactions": [
+            {
+                "symbol": tx.instrument.symbol,
+                "side": tx.type,
+                "quantity": str(tx.quantity),
+                "price": str(tx.price),
+            }
+            for tx in result.transactions
+        ],
+    })
+
+
+@login_required
+@require_GET
+async def export_data(request, kind, fmt):
+    """Stream the user's transactions or snapshots since the last reset as CSV or Parquet."""
+    if kind not in exports.EXPORTS or fmt not in exports.FORMATS:
+        raise Http404("Unknown export")
+    portfolio = await _aportfolio(request)
+    try:
+        chunks = exports.chunks(kind, fmt, portfolio, settings.EXPORT_CHUNK_SIZE)
+    except exports.ParquetUnavailable as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    response = StreamingHttpResponse(exports.achunks(chunks), content_type=exports.CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{kind}-{timezone.localdate():%Y%m%d}.{fmt}"'
+    return response
+
+
+@require_GET
+def prometheus_metrics(request):
+    """Request timings per view for this process, in Prometheus text format."""
+    return HttpResponse(metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")